@@ -0,0 +1,89 @@
+import threading
+from models import db, business_owners, Branch, Position, Service
+from cache import TTLCache, after_commit
+from database import on_primary
+
+ACL_CACHE_SIZE = 1000
+ACL_CACHE_TTL = 60
+
+
+class OwnerACL:
+    # Everything one owner may manage. Positions and services map to their
+    # branch so callers can invalidate catalog entries without reloading it.
+    def __init__(self, business_ids, branch_ids, positions, services):
+        self.business_ids = business_ids
+        self.branch_ids = branch_ids
+        self.positions = positions
+        self.services = services
+
+    def allows(self, kind, object_id):
+        if kind == 'business':
+            return object_id in self.business_ids
+        if kind == 'branch':
+            return object_id in self.branch_ids
+        if kind == 'position':
+            return object_id in self.positions
+        if kind == 'service':
+            return object_id in self.services
+        raise ValueError(kind)
+
+
+# owner_id -> OwnerACL
+acl_cache = TTLCache(ACL_CACHE_SIZE, ACL_CACHE_TTL)
+_generation = 0
+_generation_lock = threading.Lock()
+
+
+def build_owner_acl(owner_id):
+    business_ids = frozenset(db.session.execute(
+        db.select(business_owners.c.business_id).where(business_owners.c.admin_id == owner_id)
+    ).scalars())
+    branch_ids = frozenset(db.session.execute(
+        db.select(Branch.id).where(Branch.business_id.in_(business_ids))
+    ).scalars()) if business_ids else frozenset()
+    positions = dict(db.session.execute(
+        db.select(Position.id, Position.branch_id).where(Position.branch_id.in_(branch_ids))
+    ).all()) if branch_ids else {}
+    services = dict(db.session.execute(
+        db.select(Service.id, Service.branch_id).where(Service.branch_id.in_(branch_ids))
+    ).all()) if branch_ids else {}
+    return OwnerACL(business_ids, branch_ids, positions, services)
+
+
+def get_owner_acl(owner_id):
+    entry = acl_cache.get(owner_id)
+    if entry is not None:
+        return entry
+
+    generation = _generation
+    with on_primary(db.session):
+        entry = build_owner_acl(owner_id)
+    # An invalidation that landed while we were reading may have been missed.
+    with _generation_lock:
+        if generation == _generation:
+            acl_cache.set(owner_id, entry)
+    return entry
+
+
+def get_owner_acl_allowing(owner_id, kind, object_id):
+    # Other processes' structure changes only reach this cache through its
+    # TTL, so a deny is rechecked against the primary before it is trusted:
+    # the object may have been created by another worker a moment ago.
+    entry = get_owner_acl(owner_id)
+    if entry.allows(kind, object_id):
+        return entry
+    acl_cache.pop(owner_id)
+    return get_owner_acl(owner_id)
+
+
+def _clear():
+    global _generation
+    with _generation_lock:
+        _generation += 1
+        acl_cache.clear()
+
+
+def structure_changed():
+    # Ownership and structure changes are rare owner actions, so every cached
+    # ACL is dropped rather than tracking which owners a change touches.
+    after_commit(db.session, _clear)
@@ -14,13 +14,35 @@ from routes.developer import developer_bp
 from routes.owner import owner_bp
 from routes.manager import manager_bp
 from routes.worker import worker_bp
+from tokens import revocation_list
+import database
+import replica
+import instrumentation
+import occupancy
+import reservations
 
 from flask_jwt_extended import JWTManager
+from flask_migrate import Migrate, stamp, upgrade
+from alembic.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import inspect
+
+MIGRATIONS_DIR = os.path.join(os.path.abspath(os.path.dirname(__file__)), 'migrations')
+BASELINE_REVISION = '0001_baseline'
+migrate = Migrate()
+
+# Tables derived from other data; refilled from the application code when
+# the revision that creates them is part of an upgrade.
+BACKFILLS = {
+    '0002_worker_day_occupancy': occupancy.rebuild_index,
+    '0004_slot_reservations': reservations.rebuild
+}
 
 def create_app():
     app = Flask(__name__)
     CORS(app, resources={r"/*": {"origins": ["http://localhost:3000", "http://127.0.0.1:3000"]}}, supports_credentials=True)
     app.config.from_object(Config)
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', database.engine_options(app.config))
 
 
     app.config['JWT_SECRET_KEY'] = app.config['SECRET_KEY']
@@ -37,7 +59,21 @@ def create_app():
         print("Invalid token:", callback)
         return jsonify({'error': 'Invalid token'}), 401
 
+    @jwt.token_in_blocklist_loader
+    def token_revoked(jwt_header, jwt_payload):
+        return revocation_list.is_revoked(jwt_payload)
+
+    @jwt.revoked_token_loader
+    def revoked_token_response(jwt_header, jwt_payload):
+        return jsonify({'error': 'Token has been revoked'}), 401
+
     db.init_app(app)
+    migrate.init_app(app, db, directory=MIGRATIONS_DIR, render_as_batch=True)
+    with app.app_context():
+        for engine in db.engines.values():
+            database.configure_engine(engine, app.config)
+    replica.init_app(app)
+    instrumentation.init_app(app)
 
     app.register_blueprint(client_bp)
     app.register_blueprint(auth_bp)
@@ -57,8 +93,26 @@ def create_app():
 
     return app
 
+def upgrade_database():
+    # Databases created by db.create_all() before migrations existed match
+    # the baseline revision.
+    tables = inspect(db.engine).get_table_names()
+    if 'admins' in tables and 'alembic_version' not in tables:
+        stamp(revision=BASELINE_REVISION)
+
+    with db.engine.connect() as connection:
+        current = MigrationContext.configure(connection).get_current_revision()
+    script = ScriptDirectory.from_config(migrate.get_config(MIGRATIONS_DIR))
+    pending = {revision.revision for revision in script.iterate_revisions('heads', current)}
+
+    upgrade()
+    for revision, backfill in BACKFILLS.items():
+        if revision in pending:
+            backfill()
+    db.session.commit()
+
 if __name__ == '__main__':
     app = create_app()
     with app.app_context():
-        db.create_all()
+        upgrade_database()
     app.run(debug=True)
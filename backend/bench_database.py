@@ -0,0 +1,111 @@
+import sys
+import os
+
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+import argparse
+import random
+import tempfile
+import threading
+import time as clock
+from datetime import datetime, time, timedelta
+from sqlalchemy import func
+from sqlalchemy.exc import OperationalError
+
+from config import Config
+from models import db, Appointment, Business, Branch, Position, Service, Worker
+
+# Runs the same mixed read/write load against a throwaway SQLite file twice,
+# once with the driver defaults and once with the tuned connection pragmas,
+# and prints the throughput of each.
+parser = argparse.ArgumentParser(description='SQLite pragma read/write benchmark')
+parser.add_argument('--readers', type=int, default=8)
+parser.add_argument('--writers', type=int, default=4)
+parser.add_argument('--seconds', type=float, default=5)
+args = parser.parse_args()
+
+from app import create_app
+
+
+def seed(app):
+    with app.app_context():
+        db.create_all()
+        business = Business(name='Bench')
+        db.session.add(business)
+        db.session.flush()
+        branch = Branch(name='Bench', business_id=business.id, locality='-', address='-', phone_number='-',
+                        start_work_hour=time(0, 0), end_work_hour=time(23, 55))
+        db.session.add(branch)
+        db.session.flush()
+        position = Position(name='Barber', branch_id=branch.id)
+        service = Service(name='Haircut', duration=30, branch_id=branch.id)
+        db.session.add_all([position, service])
+        db.session.flush()
+        workers = [Worker(name=f'Bench {i}', position_id=position.id, branch_id=branch.id,
+                          email=f'bench{i}@example.com', password='-') for i in range(args.writers)]
+        db.session.add_all(workers)
+        db.session.commit()
+        return [w.id for w in workers], service.id, branch.id
+
+
+def run(pragmas):
+    Config.SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+    Config.SQLITE_PRAGMAS = pragmas
+    app = create_app()
+    worker_ids, service_id, branch_id = seed(app)
+    counts = {'reads': 0, 'writes': 0, 'errors': 0}
+    lock = threading.Lock()
+    stop_at = clock.monotonic() + args.seconds
+    start_day = datetime.combine(datetime.now().date(), time(0, 0))
+
+    def write(worker_id):
+        done = errors = 0
+        with app.app_context():
+            slot = start_day
+            while clock.monotonic() < stop_at:
+                db.session.add(Appointment(worker_id=worker_id, service_id=service_id, branch_id=branch_id,
+                                           datetime=slot, customer_name='Bench', customer_phone='-', status='Waiting'))
+                try:
+                    db.session.commit()
+                    done += 1
+                except OperationalError:
+                    db.session.rollback()
+                    errors += 1
+                slot += timedelta(minutes=30)
+        with lock:
+            counts['writes'] += done
+            counts['errors'] += errors
+
+    def read():
+        done = errors = 0
+        with app.app_context():
+            while clock.monotonic() < stop_at:
+                day = start_day + timedelta(days=random.randrange(30))
+                try:
+                    db.session.query(func.count(Appointment.id)).filter(
+                        Appointment.worker_id == random.choice(worker_ids),
+                        Appointment.datetime >= day,
+                        Appointment.datetime < day + timedelta(days=1)
+                    ).scalar()
+                    done += 1
+                except OperationalError:
+                    errors += 1
+                db.session.rollback()
+        with lock:
+            counts['reads'] += done
+            counts['errors'] += errors
+
+    threads = [threading.Thread(target=write, args=(worker_ids[i],)) for i in range(args.writers)]
+    threads += [threading.Thread(target=read) for _ in range(args.readers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return {name: value / args.seconds for name, value in counts.items()}
+
+
+results = {'defaults': run(False), 'tuned': run(True)}
+print(f"{'':10}{'reads/s':>12}{'writes/s':>12}{'errors/s':>12}")
+for name, result in results.items():
+    print(f"{name:10}{result['reads']:12.0f}{result['writes']:12.0f}{result['errors']:12.1f}")
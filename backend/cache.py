@@ -0,0 +1,65 @@
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+_MISSING = object()
+
+
+class TTLCache:
+    # Thread-safe LRU mapping whose entries also expire `ttl` seconds after
+    # they were stored.
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            entry = self._data.pop(key, _MISSING)
+        return None if entry is _MISSING else entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+def after_commit(session, callback, *args):
+    # Defers cache invalidation until the change is durable, so a concurrent
+    # reader cannot repopulate an entry from the pre-commit state.
+    session.info.setdefault('after_commit', []).append((callback, args))
+
+
+@event.listens_for(Session, 'after_commit')
+def _run_after_commit(session):
+    for callback, args in session.info.pop('after_commit', []):
+        callback(*args)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_after_commit(session):
+    session.info.pop('after_commit', None)
@@ -0,0 +1,212 @@
+import gzip
+import hashlib
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from sqlalchemy import select, update
+from models import db, Branch, Business, Position, Service, ServiceCost
+from cache import TTLCache, after_commit
+from database import on_primary
+
+MENU_CACHE_SIZE = 5000
+MENU_CACHE_TTL = 60 * 60
+DIRECTORY_CACHE_SIZE = 1000
+DIRECTORY_CACHE_TTL = 60 * 60
+
+# position_id -> (branch catalog_version, [{'id', 'name', 'duration', 'price'}, ...])
+menu_cache = TTLCache(MENU_CACHE_SIZE, MENU_CACHE_TTL)
+# business_id -> (directory_version, (json body, gzipped body, strong etag))
+directory_cache = TTLCache(DIRECTORY_CACHE_SIZE, DIRECTORY_CACHE_TTL)
+
+
+def get_position_menu(position_id):
+    # Checked against the branch's catalog_version on every read, so a price
+    # or service change made by another process is never served from here.
+    with on_primary(db.session):
+        version = db.session.execute(
+            select(Branch.catalog_version).join(Position, Position.branch_id == Branch.id)
+            .where(Position.id == position_id)
+        ).scalar_one_or_none()
+        cached = menu_cache.get(position_id)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        rows = db.session.query(
+            Service.id,
+            Service.name,
+            Service.duration,
+            ServiceCost.price
+        ).join(ServiceCost, ServiceCost.service_id == Service.id).filter(
+            ServiceCost.position_id == position_id
+        ).order_by(ServiceCost.id).all()
+
+    menu = [{
+        'id': service_id,
+        'name': name,
+        'duration': duration,
+        'price': price
+    } for service_id, name, duration, price in rows]
+    menu_cache.set(position_id, (version, menu))
+    return menu
+
+
+class BranchSnapshots:
+    # Ready-to-send JSON for /branches/<id>/services_by_position. Every catalog
+    # change bumps branches.catalog_version in the same transaction, and each
+    # read compares it with the snapshot's, so a change made by another
+    # process is picked up on the next request.
+    def __init__(self):
+        self._snapshots = {}
+        self._lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='catalog-snapshot')
+
+    def get(self, branch_id):
+        with on_primary(db.session):
+            version = db.session.execute(
+                select(Branch.catalog_version).where(Branch.id == branch_id)
+            ).scalar_one_or_none()
+            if version is None:
+                with self._lock:
+                    self._snapshots.pop(branch_id, None)
+                return None
+            with self._lock:
+                snapshot = self._snapshots.get(branch_id)
+            if snapshot is not None and snapshot[0] == version:
+                return snapshot
+            return self._build(branch_id, version)
+
+    def _build(self, branch_id, version):
+        catalog = build_branch_catalog(branch_id)
+        body = current_app.json.dumps(catalog).encode()
+        snapshot = (version, body, f'{branch_id}-{version}')
+        # A snapshot stored by a slower, older build is simply rebuilt on the
+        # next read, since its version no longer matches.
+        with self._lock:
+            self._snapshots[branch_id] = snapshot
+        return snapshot
+
+    def _rebuild(self, app, branch_id):
+        with app.app_context():
+            self.get(branch_id)
+
+    def invalidate(self, branch_ids):
+        app = current_app._get_current_object()
+        for branch_id in branch_ids:
+            with self._lock:
+                self._snapshots.pop(branch_id, None)
+            self.executor.submit(self._rebuild, app, branch_id)
+
+
+branch_snapshots = BranchSnapshots()
+
+
+def build_branch_catalog(branch_id):
+    rows = db.session.query(
+        Position.id,
+        Position.name,
+        Service.id,
+        Service.name,
+        Service.duration,
+        ServiceCost.price
+    ).outerjoin(ServiceCost, ServiceCost.position_id == Position.id
+    ).outerjoin(Service, Service.id == ServiceCost.service_id
+    ).filter(Position.branch_id == branch_id
+    ).order_by(Position.id, ServiceCost.id).all()
+
+    response = []
+    for position_id, position_name, service_id, name, duration, price in rows:
+        if not response or response[-1]['position_id'] != position_id:
+            response.append({
+                'position_id': position_id,
+                'position_name': position_name,
+                'services': []
+            })
+        if service_id is not None:
+            response[-1]['services'].append({
+                'id': service_id,
+                'name': name,
+                'duration': duration,
+                'price': price
+            })
+    return response
+
+
+def get_business_directory(business_id):
+    # Same scheme as the menus: business_changed bumps directory_version in
+    # the writing transaction and every read compares it.
+    with on_primary(db.session):
+        version = db.session.execute(
+            select(Business.directory_version).where(Business.id == business_id)
+        ).scalar_one_or_none()
+        if version is None:
+            directory_cache.pop(business_id)
+            return None
+        cached = directory_cache.get(business_id)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        business = db.session.get(Business, business_id)
+        grouped = defaultdict(list)
+        for branch in Branch.query.filter_by(business_id=business_id).all():
+            grouped[branch.locality].append({
+                'id': branch.id,
+                'name': branch.name,
+                'address': branch.address,
+                'phone_number': branch.phone_number,
+                'start_work_hour': branch.start_work_hour.strftime('%H:%M'),
+                'end_work_hour': branch.end_work_hour.strftime('%H:%M')
+            })
+
+    body = current_app.json.dumps({
+        'business_name': business.name,
+        'branches': grouped
+    }).encode()
+    directory = (body, gzip.compress(body, compresslevel=9), hashlib.sha1(body).hexdigest())
+    directory_cache.set(business_id, (version, directory))
+    return directory
+
+
+def business_changed(business_id):
+    db.session.execute(
+        update(Business).where(Business.id == business_id)
+        .values(directory_version=Business.directory_version + 1)
+    )
+    after_commit(db.session, directory_cache.pop, business_id)
+
+
+def invalidate_positions(position_ids):
+    for position_id in position_ids:
+        menu_cache.pop(position_id)
+
+
+def invalidate(position_ids, branch_ids):
+    invalidate_positions(position_ids)
+    branch_snapshots.invalidate(branch_ids)
+
+
+def bump_catalog_versions(branch_ids):
+    db.session.execute(
+        update(Branch).where(Branch.id.in_(branch_ids))
+        .values(catalog_version=Branch.catalog_version + 1)
+    )
+
+
+def position_changed(position_id, branch_id):
+    bump_catalog_versions([branch_id])
+    after_commit(db.session, invalidate, [position_id], [branch_id])
+
+
+def branch_changed(branch_id):
+    bump_catalog_versions([branch_id])
+    after_commit(db.session, branch_snapshots.invalidate, [branch_id])
+
+
+def service_changed(service):
+    # Must run before the service's cost rows are deleted.
+    rows = db.session.query(Position.id, Position.branch_id).join(
+        ServiceCost, ServiceCost.position_id == Position.id
+    ).filter(ServiceCost.service_id == service.id).all()
+    branch_ids = {branch_id for _, branch_id in rows} | {service.branch_id}
+    bump_catalog_versions(branch_ids)
+    after_commit(db.session, invalidate, [position_id for position_id, _ in rows], branch_ids)
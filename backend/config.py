@@ -1,7 +1,59 @@
 import os
 
+
+def env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+def database_url():
+    url = os.environ.get('DATABASE_URL')
+    if not url:
+        return 'sqlite:///' + os.path.join(os.path.abspath('instance'), 'database.db')
+    # Some hosts still hand out the pre-1.4 scheme.
+    if url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-key-123'
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(os.path.abspath('instance'), 'database.db')
+    SQLALCHEMY_DATABASE_URI = database_url()
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    INITIAL_ADMIN_SECRET = 'initial-admin-secret-123'
\ No newline at end of file
+    INITIAL_ADMIN_SECRET = 'initial-admin-secret-123'
+
+    # Connection pool, ignored for in-memory SQLite.
+    DB_POOL_SIZE = env_int('DB_POOL_SIZE', 5)
+    DB_MAX_OVERFLOW = env_int('DB_MAX_OVERFLOW', 10)
+    DB_POOL_RECYCLE = env_int('DB_POOL_RECYCLE', 30 * 60)
+    DB_POOL_TIMEOUT = env_int('DB_POOL_TIMEOUT', 30)
+
+    # Optional read replica for the routes listed in replica.REPLICA_ROUTES.
+    # REPLICA_SYNC_SECONDS > 0 keeps a local SQLite replica in sync with the
+    # backup API; otherwise the replica is assumed to be REPLICA_LAG_SECONDS
+    # behind the primary.
+    if os.environ.get('DATABASE_REPLICA_URL'):
+        SQLALCHEMY_BINDS = {'replica': os.environ['DATABASE_REPLICA_URL']}
+    REPLICA_SYNC_SECONDS = env_int('REPLICA_SYNC_SECONDS', 0)
+    REPLICA_LAG_SECONDS = env_int('REPLICA_LAG_SECONDS', 2)
+
+    # Per-request SQL counting and timing, reported in the X-DB-Queries and
+    # Server-Timing headers. SQL_QUERY_BUDGET_STRICT is meant for
+    # development: endpoints over their @query_budget fail with a 500.
+    SQL_INSTRUMENTATION = os.environ.get('SQL_INSTRUMENTATION', '1') != '0'
+    SQL_REPEATED_QUERY_THRESHOLD = env_int('SQL_REPEATED_QUERY_THRESHOLD', 5)
+    SQL_QUERY_BUDGET_STRICT = os.environ.get('SQL_QUERY_BUDGET_STRICT') == '1'
+
+    # Statements slower than SLOW_QUERY_MS (0 turns it off) are kept with
+    # their parameters, route and plan in a per-process ring buffer served on
+    # /developer/slow-queries and appended to a log file shared by all
+    # processes; rotate that file externally (e.g. logrotate).
+    SLOW_QUERY_MS = env_int('SLOW_QUERY_MS', 200)
+    SLOW_QUERY_BUFFER_SIZE = env_int('SLOW_QUERY_BUFFER_SIZE', 200)
+    SLOW_QUERY_LOG_FILE = os.environ.get('SLOW_QUERY_LOG_FILE', os.path.join(os.path.abspath('instance'), 'slow_queries.log'))
+
+    # Per-connection SQLite tuning, applied by database.configure_engine.
+    SQLITE_PRAGMAS = os.environ.get('SQLITE_PRAGMAS', '1') != '0'
+    SQLITE_BUSY_TIMEOUT_MS = env_int('SQLITE_BUSY_TIMEOUT_MS', 5000)
+    SQLITE_MMAP_SIZE = env_int('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)
+    SQLITE_CACHE_SIZE_KB = env_int('SQLITE_CACHE_SIZE_KB', 64 * 1024)
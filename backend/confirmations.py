@@ -0,0 +1,51 @@
+from flask import current_app
+from sqlalchemy import and_
+from models import db, Appointment, Branch, Service, ServiceCost, Worker
+from cache import TTLCache, after_commit
+
+CONFIRMATION_CACHE_SIZE = 10000
+CONFIRMATION_CACHE_TTL = 30
+
+# appointment_id -> serialized confirmation payload
+confirmation_cache = TTLCache(CONFIRMATION_CACHE_SIZE, CONFIRMATION_CACHE_TTL)
+
+
+def get_confirmation(appointment_id):
+    body = confirmation_cache.get(appointment_id)
+    if body is not None:
+        return body
+
+    row = db.session.query(
+        Appointment,
+        Worker,
+        Service,
+        Branch,
+        ServiceCost.price
+    ).outerjoin(Worker, Worker.id == Appointment.worker_id
+    ).outerjoin(Service, Service.id == Appointment.service_id
+    ).outerjoin(Branch, Branch.id == Appointment.branch_id
+    ).outerjoin(ServiceCost, and_(
+        ServiceCost.position_id == Worker.position_id,
+        ServiceCost.service_id == Appointment.service_id
+    )).filter(Appointment.id == appointment_id).order_by(ServiceCost.id).first()
+    if not row:
+        return None
+
+    appointment, worker, service, branch, price = row
+    body = current_app.json.dumps({
+        'id': appointment.id,
+        'worker': {'id': worker.id, 'name': worker.name} if worker else None,
+        'service': {'id': service.id, 'name': service.name, 'duration': service.duration} if service else None,
+        'branch': {'id': branch.id, 'name': branch.name, 'locality': branch.locality, 'address': branch.address} if branch else None,
+        'datetime': appointment.datetime.isoformat(),
+        'customer_name': appointment.customer_name,
+        'customer_phone': appointment.customer_phone,
+        'status': appointment.status,
+        'price': price
+    }).encode()
+    confirmation_cache.set(appointment_id, body)
+    return body
+
+
+def appointment_changed(appointment_id):
+    after_commit(db.session, confirmation_cache.pop, appointment_id)
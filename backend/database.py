@@ -0,0 +1,80 @@
+from contextlib import contextmanager
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+
+def is_memory_sqlite(url):
+    url = make_url(url)
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+
+def engine_options(config):
+    uri = config['SQLALCHEMY_DATABASE_URI']
+    if is_memory_sqlite(uri):
+        return {}
+    options = {
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_timeout': config['DB_POOL_TIMEOUT']
+    }
+    if make_url(uri).get_backend_name() != 'sqlite':
+        # Server databases drop idle connections behind our back.
+        options['pool_pre_ping'] = True
+    return options
+
+
+def sqlite_pragmas(config):
+    # WAL lets readers run alongside the single writer, and NORMAL sync is
+    # durable in WAL mode except for the last transactions on power loss.
+    return [
+        'PRAGMA journal_mode=WAL',
+        'PRAGMA synchronous=NORMAL',
+        f"PRAGMA busy_timeout={config['SQLITE_BUSY_TIMEOUT_MS']}",
+        f"PRAGMA mmap_size={config['SQLITE_MMAP_SIZE']}",
+        f"PRAGMA cache_size=-{config['SQLITE_CACHE_SIZE_KB']}"
+    ]
+
+
+def configure_engine(engine, config):
+    if engine.dialect.name != 'sqlite' or not config['SQLITE_PRAGMAS']:
+        return
+    pragmas = sqlite_pragmas(config)
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+
+class RoutingSession(Session):
+    # Reads go to the 'replica' bind while the request allows it (see
+    # replica.py). Anything that flushes, and every read after it in the same
+    # session, stays on the primary.
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if getattr(clause, 'is_dml', False):
+            self.info['wrote'] = True
+        if (bind is None and self.info.get('use_replica') and 'replica' in self._db.engines
+                and not self.info.get('wrote') and not self._flushing):
+            return self._db.engines['replica']
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _mark_wrote(session, flush_context):
+    session.info['wrote'] = True
+
+
+@contextmanager
+def on_primary(session):
+    # For reads whose result outlives the request, such as shared caches,
+    # which must not be filled from a lagging replica.
+    use_replica = session.info.pop('use_replica', None)
+    try:
+        yield session
+    finally:
+        if use_replica is not None:
+            session.info['use_replica'] = use_replica
@@ -0,0 +1,63 @@
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import func, insert
+from models import db, SlotHold
+import reservations
+
+HOLD_SECONDS = 5 * 60
+# Live holds a single client address, and a single worker, may have at once.
+HOLDS_PER_CLIENT = 3
+HOLDS_PER_WORKER = 5
+
+
+class HoldLimit(Exception):
+    pass
+
+
+def _live_holds(*criteria):
+    return db.session.query(func.count(func.distinct(SlotHold.hold_id))).filter(
+        SlotHold.expires_at > datetime.now(), *criteria
+    ).scalar()
+
+
+def create(worker_id, start, duration_minutes, client, replaces=None):
+    # Holds live in the database so every process sees them. The caller
+    # commits; a cell already held by someone else raises IntegrityError
+    # on the (worker_id, slot_start) unique index, like a booking would.
+    now = datetime.now()
+    SlotHold.query.filter(SlotHold.expires_at <= now).delete(synchronize_session=False)
+    if replaces:
+        SlotHold.query.filter_by(hold_id=replaces, client=client).delete(synchronize_session=False)
+
+    if _live_holds(SlotHold.client == client) >= HOLDS_PER_CLIENT:
+        raise HoldLimit('Too many active holds for this client')
+    if _live_holds(SlotHold.worker_id == worker_id) >= HOLDS_PER_WORKER:
+        raise HoldLimit('Too many active holds for this worker')
+
+    hold_id = uuid.uuid4().hex
+    expires_at = now + timedelta(seconds=HOLD_SECONDS)
+    db.session.execute(insert(SlotHold), [
+        {'hold_id': hold_id, 'worker_id': worker_id, 'slot_start': cell, 'client': client, 'expires_at': expires_at}
+        for cell in reservations.reservation_cells(start, duration_minutes)
+    ])
+    return hold_id, expires_at
+
+
+def release(hold_id):
+    return SlotHold.query.filter_by(hold_id=hold_id).delete(synchronize_session=False) > 0
+
+
+def release_worker(worker_id):
+    SlotHold.query.filter_by(worker_id=worker_id).delete(synchronize_session=False)
+
+
+def blocking_hold(worker_id, start, duration_minutes, hold_id=None):
+    # Whether a live hold by someone else covers any cell of the booking.
+    query = db.session.query(SlotHold.id).filter(
+        SlotHold.worker_id == worker_id,
+        SlotHold.slot_start.in_(reservations.reservation_cells(start, duration_minutes)),
+        SlotHold.expires_at > datetime.now()
+    )
+    if hold_id:
+        query = query.filter(SlotHold.hold_id != hold_id)
+    return db.session.query(query.exists()).scalar()
@@ -0,0 +1,127 @@
+import hashlib
+import time
+from datetime import datetime, timedelta
+from functools import wraps
+from flask import request, jsonify, make_response
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from models import db, IdempotencyKey
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+IDEMPOTENCY_STORE_SIZE = 10000
+IDEMPOTENCY_TTL = 24 * 60 * 60
+IDEMPOTENCY_WAIT_SECONDS = 30
+IDEMPOTENCY_POLL_SECONDS = 0.2
+# A key whose first request has not finished after this long is assumed to
+# belong to a dead worker and may be taken over by a retry.
+IDEMPOTENCY_STALE_SECONDS = 120
+IDEMPOTENCY_PURGE_SECONDS = 60
+
+_last_purge = 0
+
+
+def purge(now):
+    global _last_purge
+    if time.monotonic() - _last_purge < IDEMPOTENCY_PURGE_SECONDS:
+        return
+    _last_purge = time.monotonic()
+    db.session.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at <= now))
+    # Fresh keys cost one row each, so beyond IDEMPOTENCY_STORE_SIZE the
+    # oldest completed responses are evicted; in-flight rows are kept.
+    cutoff = select(IdempotencyKey.id).order_by(IdempotencyKey.id.desc()).offset(IDEMPOTENCY_STORE_SIZE).limit(1).scalar_subquery()
+    db.session.execute(delete(IdempotencyKey).where(IdempotencyKey.id <= cutoff, IdempotencyKey.status_code.is_not(None)))
+
+
+def begin(store_key, fingerprint):
+    # Claims the key for this request by inserting an in-flight row. Returns
+    # None when the caller owns the key, otherwise the row that already holds it.
+    now = datetime.now()
+    purge(now)
+    try:
+        db.session.execute(insert(IdempotencyKey).values(
+            key=store_key, fingerprint=fingerprint, created_at=now,
+            expires_at=now + timedelta(seconds=IDEMPOTENCY_TTL),
+        ))
+        db.session.commit()
+        return None
+    except IntegrityError:
+        db.session.rollback()
+
+    row = db.session.execute(select(IdempotencyKey).where(IdempotencyKey.key == store_key)).scalar_one_or_none()
+    if row is None:
+        return begin(store_key, fingerprint)
+    if row.status_code is None and row.created_at < now - timedelta(seconds=IDEMPOTENCY_STALE_SECONDS):
+        taken = db.session.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.id == row.id, IdempotencyKey.status_code.is_(None),
+                   IdempotencyKey.created_at == row.created_at)
+            .values(fingerprint=fingerprint, created_at=now)
+        ).rowcount
+        db.session.commit()
+        if taken:
+            return None
+    return row
+
+
+def wait_for(store_key):
+    deadline = time.monotonic() + IDEMPOTENCY_WAIT_SECONDS
+    while True:
+        db.session.expire_all()
+        row = db.session.execute(select(IdempotencyKey).where(IdempotencyKey.key == store_key)).scalar_one_or_none()
+        if row is None or row.status_code is not None or time.monotonic() >= deadline:
+            return row
+        db.session.rollback()
+        time.sleep(IDEMPOTENCY_POLL_SECONDS)
+
+
+def finish(store_key, response):
+    # Only outcomes that a retry would reproduce are remembered: successes and
+    # conflicts. Anything else frees the key so the client can try again.
+    db.session.rollback()
+    if response is not None and (200 <= response.status_code < 300 or response.status_code == 409) \
+            and not response.is_streamed:
+        db.session.execute(
+            update(IdempotencyKey).where(IdempotencyKey.key == store_key)
+            .values(status_code=response.status_code, body=response.get_data(), mimetype=response.mimetype)
+        )
+    else:
+        db.session.execute(delete(IdempotencyKey).where(IdempotencyKey.key == store_key))
+    db.session.commit()
+
+
+def replay(row):
+    response = make_response(row.body, row.status_code)
+    response.mimetype = row.mimetype
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(f):
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key or request.method == 'OPTIONS':
+            return f(*args, **kwargs)
+
+        store_key = hashlib.sha256(f'{request.method}|{request.path}|{key}'.encode()).hexdigest()
+        fingerprint = hashlib.sha256(request.get_data()).hexdigest()
+
+        row = begin(store_key, fingerprint)
+        if row is not None:
+            if row.fingerprint != fingerprint:
+                return jsonify({'error': 'Idempotency-Key was already used with a different request'}), 422
+            if row.status_code is None:
+                row = wait_for(store_key)
+            if row is None:
+                return jsonify({'error': 'The earlier request with this Idempotency-Key failed, retry it'}), 409
+            if row.status_code is None:
+                return jsonify({'error': 'A request with this Idempotency-Key is still in progress'}), 409
+            return replay(row)
+
+        response = None
+        try:
+            response = make_response(f(*args, **kwargs))
+            return response
+        finally:
+            finish(store_key, response)
+    return decorated
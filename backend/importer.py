@@ -0,0 +1,206 @@
+import csv
+import io
+import json
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+from itertools import islice
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from models import db, Appointment, Service, SlotReservation, Worker
+import occupancy
+import reservations
+import scheduling
+
+IMPORT_CHUNK_SIZE = 500
+IMPORT_STATUSES = ('Waiting', 'In-process', 'Finished', 'Canceled')
+REQUIRED_FIELDS = ('worker', 'service', 'datetime', 'customer_name', 'customer_phone')
+
+
+def iter_rows(stream, content_type):
+    # Yields (row_number, dict or error message) without reading the whole
+    # body into memory.
+    if content_type == 'text/csv':
+        text = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+        number = 0
+        try:
+            for number, row in enumerate(csv.DictReader(text), start=1):
+                yield number, row
+        except UnicodeDecodeError:
+            # A CSV row may span lines, so there is no safe place to resume;
+            # the rows already read are still imported and reported.
+            yield number + 1, 'Invalid UTF-8; this row and the rest of the file were not read'
+        return
+
+    for number, line in enumerate(stream, start=1):
+        try:
+            line = line.decode('utf-8')
+        except UnicodeDecodeError:
+            yield number, 'Invalid UTF-8'
+            continue
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield number, 'Invalid JSON'
+            continue
+        yield number, row if isinstance(row, dict) else 'Row must be a JSON object'
+
+
+class BranchImport:
+    def __init__(self, branch_id):
+        self.branch_id = branch_id
+        # One prefetch each; rows may reference workers by id or email and
+        # services by id or name. Plain tuples survive the per-chunk commits
+        # without being expired and reloaded.
+        workers = db.session.query(Worker.id, Worker.email).filter(Worker.branch_id == branch_id).all()
+        services = db.session.query(Service.id, Service.name, Service.duration).filter(Service.branch_id == branch_id).all()
+        self.workers = {str(worker_id): worker_id for worker_id, _ in workers}
+        self.workers.update({email: worker_id for worker_id, email in workers})
+        self.services = {str(service_id): (service_id, duration) for service_id, _, duration in services}
+        self.services.update({name: (service_id, duration) for service_id, name, duration in services})
+
+        self.existing = {}
+        self.accepted = {}
+        self.imported = 0
+        self.errors = []
+
+    def load_existing(self, keys):
+        missing = {key for key in keys if key not in self.existing}
+        if not missing:
+            return
+        intervals = scheduling.load_appointment_intervals(
+            {worker_id for worker_id, _ in missing},
+            min(day for _, day in missing),
+            max(day for _, day in missing)
+        )
+        for key in missing:
+            self.existing[key] = scheduling.BookedIntervals(intervals.get(key, []))
+            self.accepted[key] = []
+
+    def overlaps_accepted(self, key, start, end):
+        # Accepted rows never overlap each other, so only the neighbours of
+        # the insertion point need checking.
+        accepted = self.accepted[key]
+        i = bisect_left(accepted, (start, end))
+        if i > 0 and accepted[i - 1][1] > start:
+            return True
+        return i < len(accepted) and accepted[i][0] < end
+
+    def parse(self, row):
+        if isinstance(row, str):
+            return None, row
+        missing = [field for field in REQUIRED_FIELDS if not row.get(field)]
+        if missing:
+            return None, f"Missing fields: {', '.join(missing)}"
+
+        worker_id = self.workers.get(str(row['worker']))
+        if not worker_id:
+            return None, 'Worker not found in this branch'
+        service = self.services.get(str(row['service']))
+        if not service:
+            return None, 'Service not found in this branch'
+        service_id, duration = service
+        try:
+            start = datetime.fromisoformat(str(row['datetime']))
+        except ValueError:
+            return None, 'Invalid datetime format'
+        status = row.get('status') or 'Waiting'
+        if status not in IMPORT_STATUSES:
+            return None, 'Invalid status value'
+
+        return {
+            'worker_id': worker_id,
+            'service_id': service_id,
+            'branch_id': self.branch_id,
+            'datetime': start,
+            'customer_name': row['customer_name'],
+            'customer_phone': row['customer_phone'],
+            'status': status,
+            '_duration': duration
+        }, None
+
+    def import_chunk(self, chunk):
+        parsed = []
+        for number, row in chunk:
+            values, error = self.parse(row)
+            if error:
+                self.errors.append({'row': number, 'error': error})
+            else:
+                parsed.append((number, values))
+
+        self.load_existing({(values['worker_id'], values['datetime'].date()) for _, values in parsed if values['status'] != 'Canceled'})
+
+        rows = []
+        for number, values in parsed:
+            if values['status'] != 'Canceled':
+                key = (values['worker_id'], values['datetime'].date())
+                start = values['datetime']
+                end = start + timedelta(minutes=values['_duration'])
+                if self.existing[key].overlaps(start, end) or self.overlaps_accepted(key, start, end):
+                    self.errors.append({'row': number, 'error': 'Time slot is already booked'})
+                    continue
+                insort(self.accepted[key], (start, end))
+            rows.append((number, values))
+        if not rows:
+            return
+
+        try:
+            self.insert_rows(rows)
+        except IntegrityError:
+            # Someone booked one of these slots while the chunk was in flight;
+            # retry row by row so only the rows that actually collide fail.
+            db.session.rollback()
+            for (number, values), (key, interval) in zip(rows, self.intervals(rows)):
+                try:
+                    self.insert_rows([(number, values)])
+                except IntegrityError:
+                    db.session.rollback()
+                    if key:
+                        self.accepted[key].remove(interval)
+                    self.errors.append({'row': number, 'error': 'Time slot is already booked'})
+
+    def intervals(self, rows):
+        for _, values in rows:
+            if values['status'] == 'Canceled':
+                yield None, None
+                continue
+            start = values['datetime']
+            yield (values['worker_id'], start.date()), (start, start + timedelta(minutes=values['_duration']))
+
+    def insert_rows(self, rows):
+        ids = db.session.execute(
+            insert(Appointment).returning(Appointment.id, sort_by_parameter_order=True),
+            [{k: v for k, v in values.items() if not k.startswith('_')} for _, values in rows]
+        ).scalars().all()
+
+        cells = []
+        for appointment_id, (_, values) in zip(ids, rows):
+            if values['status'] == 'Canceled':
+                continue
+            for cell in reservations.reservation_cells(values['datetime'], values['_duration']):
+                cells.append({'worker_id': values['worker_id'], 'slot_start': cell, 'appointment_id': appointment_id})
+        if cells:
+            db.session.execute(insert(SlotReservation), cells)
+
+        occupancy.refresh_worker_days({key for key, _ in self.intervals(rows) if key})
+        db.session.commit()
+        self.imported += len(rows)
+
+    def run(self, rows):
+        rows = iter(rows)
+        while True:
+            chunk = list(islice(rows, IMPORT_CHUNK_SIZE))
+            if not chunk:
+                break
+            self.import_chunk(chunk)
+
+        return {
+            'imported': self.imported,
+            'failed': len(self.errors),
+            'errors': sorted(self.errors, key=lambda e: e['row'])
+        }
+
+
+def import_appointments(branch_id, stream, content_type):
+    return BranchImport(branch_id).run(iter_rows(stream, content_type))
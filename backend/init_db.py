@@ -4,21 +4,20 @@ import os
 
 sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
 
-from app import create_app
+from app import create_app, upgrade_database
 from models import db, Admin
-from werkzeug.security import generate_password_hash
+from passwords import hash_password
 
 app = create_app()
 
 with app.app_context():
-    db.create_all()
-
+    upgrade_database()
 
     developer = Admin.query.filter_by(email='developer@example.com').first()
     if not developer:
         dev_admin = Admin(
             email='developer@example.com',
-            password=generate_password_hash('devpassword'),
+            password=hash_password('devpassword'),
             role='developer',
             name='default-developer'
         )
@@ -32,7 +31,7 @@ with app.app_context():
     if not owner:
         owner_admin = Admin(
             email='initial_owner@example.com',
-            password=generate_password_hash('ownpassword'),
+            password=hash_password('ownpassword'),
             role='owner',
             name='initial-owner'
         )
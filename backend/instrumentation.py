@@ -0,0 +1,231 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+from functools import wraps
+from logging.handlers import WatchedFileHandler
+from flask import g, has_request_context, jsonify, request
+from sqlalchemy import event
+from cache import TTLCache
+from models import db
+
+SLOW_QUERY_PARAMS_LIMIT = 1000
+SLOW_QUERY_PLAN_TTL = 60
+_EXPLAINABLE = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE')
+
+# Collapses expanded IN lists so the same query with a different number of
+# ids is still counted as one shape.
+_IN_LIST = re.compile(r'\(\?(?:, \?)+\)')
+
+
+def statement_shape(statement):
+    return _IN_LIST.sub('(?)', ' '.join(statement.split()))
+
+
+class RequestQueries:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes = Counter()
+        self._context = None
+
+    def record(self, statement, seconds, context=None):
+        self.count += 1
+        self.seconds += seconds
+        # A large executemany is sent as several insertmanyvalues batches
+        # under one execution context; that is one statement, not an N+1.
+        if context is None or context is not self._context:
+            self.shapes[statement_shape(statement)] += 1
+        self._context = context
+
+    def repeated(self, threshold):
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+
+def current_route():
+    if not has_request_context():
+        return None
+    return f'{request.method} {request.url_rule.rule if request.url_rule else request.path}'
+
+
+def explain(conn, statement, parameters):
+    # Uses a raw cursor on the same connection, so the plan query neither
+    # goes through the engine events nor sees a different transaction. On
+    # servers a failed statement aborts the transaction it runs in, so the
+    # plan is taken inside a savepoint that is rolled back on error.
+    sqlite = conn.dialect.name == 'sqlite'
+    cursor = conn.connection.cursor()
+    try:
+        if sqlite:
+            cursor.execute('EXPLAIN QUERY PLAN ' + statement, parameters)
+            return [row[3] for row in cursor.fetchall()]
+        cursor.execute('SAVEPOINT slow_query_explain')
+        try:
+            cursor.execute('EXPLAIN ' + statement, parameters)
+            return [row[0] for row in cursor.fetchall()]
+        except Exception:
+            cursor.execute('ROLLBACK TO SAVEPOINT slow_query_explain')
+            raise
+        finally:
+            cursor.execute('RELEASE SAVEPOINT slow_query_explain')
+    finally:
+        cursor.close()
+
+
+class SlowQueryLog:
+    # Bounded ring of statements slower than threshold_ms, mirrored to a log
+    # file. The ring belongs to one process; the file collects every process.
+    # Plans are cached per statement shape, so a query that is slow on every
+    # request is explained once a minute, not every time.
+    def __init__(self):
+        self.threshold_ms = 0
+        self.entries = deque(maxlen=200)
+        self.plans = TTLCache(1000, SLOW_QUERY_PLAN_TTL)
+        self.logger = None
+        self._lock = threading.Lock()
+
+    def configure(self, config):
+        self.threshold_ms = config['SLOW_QUERY_MS']
+        with self._lock:
+            self.entries = deque(self.entries, maxlen=config['SLOW_QUERY_BUFFER_SIZE'])
+
+        path = config['SLOW_QUERY_LOG_FILE']
+        if self.threshold_ms and path and self.logger is None:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Every worker process appends to the same file, so it must not
+            # rotate it itself; WatchedFileHandler reopens it after an
+            # external rotation.
+            handler = WatchedFileHandler(path, encoding='utf-8', delay=True)
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            logger = logging.getLogger('slow_queries')
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            logger.addHandler(handler)
+            self.logger = logger
+
+    def plan(self, conn, statement, parameters):
+        shape = statement_shape(statement)
+        plan = self.plans.get(shape)
+        if plan is None:
+            try:
+                plan = explain(conn, statement, parameters)
+            except Exception as e:
+                plan = [f'EXPLAIN failed: {e}']
+            self.plans.set(shape, plan)
+        return plan
+
+    def record(self, conn, statement, parameters, seconds, executemany):
+        explainable = not executemany and statement.lstrip()[:6].upper().startswith(_EXPLAINABLE)
+        entry = {
+            'at': datetime.now().isoformat(timespec='milliseconds'),
+            'pid': os.getpid(),
+            'duration_ms': round(seconds * 1000, 1),
+            'route': current_route(),
+            'statement': statement,
+            'parameters': repr(parameters)[:SLOW_QUERY_PARAMS_LIMIT],
+            'executemany': executemany,
+            'plan': self.plan(conn, statement, parameters) if explainable else None
+        }
+        with self._lock:
+            self.entries.append(entry)
+        if self.logger:
+            self.logger.info(json.dumps(entry))
+
+    def snapshot(self):
+        with self._lock:
+            return list(reversed(self.entries))
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+
+
+slow_query_log = SlowQueryLog()
+
+
+def current_queries():
+    if not has_request_context():
+        return None
+    if 'sql_queries' not in g:
+        g.sql_queries = RequestQueries()
+    return g.sql_queries
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    seconds = time.perf_counter() - conn.info['query_started'].pop()
+    queries = current_queries()
+    if queries is not None:
+        queries.record(statement, seconds, context)
+    if slow_query_log.threshold_ms and seconds * 1000 >= slow_query_log.threshold_ms:
+        slow_query_log.record(conn, statement, parameters, seconds, executemany)
+
+
+def _handle_error(context):
+    if context.connection is not None:
+        started = context.connection.info.get('query_started')
+        if started:
+            started.pop()
+
+
+def query_budget(limit):
+    # Declares how many statements an endpoint may run. Over budget is logged,
+    # and rejected outright when SQL_QUERY_BUDGET_STRICT is on.
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            g.sql_query_budget = limit
+            return f(*args, **kwargs)
+        # Read by verify_query_budgets.py.
+        decorated.query_budget = limit
+        return decorated
+    return decorator
+
+
+def init_app(app):
+    slow_query_log.configure(app.config)
+    if not app.config['SQL_INSTRUMENTATION'] and not slow_query_log.threshold_ms:
+        return
+
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+            event.listen(engine, 'handle_error', _handle_error)
+
+    if not app.config['SQL_INSTRUMENTATION']:
+        return
+
+    @app.after_request
+    def report_queries(response):
+        queries = g.get('sql_queries')
+        if queries is None:
+            queries = RequestQueries()
+        route = current_route()
+
+        for shape, count in queries.repeated(app.config['SQL_REPEATED_QUERY_THRESHOLD']):
+            app.logger.warning('Possible N+1 in %s: %d x %s', route, count, shape)
+
+        budget = g.get('sql_query_budget')
+        if budget is not None and queries.count > budget:
+            app.logger.warning('%s ran %d queries, budget is %d', route, queries.count, budget)
+            if app.config['SQL_QUERY_BUDGET_STRICT']:
+                response = jsonify({
+                    'error': 'Query budget exceeded',
+                    'route': route,
+                    'queries': queries.count,
+                    'budget': budget,
+                    'repeated': [{'statement': shape, 'count': count} for shape, count in queries.repeated(2)]
+                })
+                response.status_code = 500
+
+        response.headers['X-DB-Queries'] = str(queries.count)
+        response.headers.add('Server-Timing', f'db;dur={queries.seconds * 1000:.1f};desc="{queries.count} queries"')
+        return response
@@ -0,0 +1,36 @@
+"""worker day occupancy index
+
+Revision ID: 0002_worker_day_occupancy
+Revises: 0001_baseline
+Create Date: 2026-10-18 04:19:39.104512
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002_worker_day_occupancy'
+down_revision = '0001_baseline'
+branch_labels = None
+depends_on = None
+
+
+# The rows are derived from work hours and appointments; app.upgrade_database
+# fills them with occupancy.rebuild_index() after this revision is applied.
+def upgrade():
+    op.create_table('worker_day_occupancy',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('worker_id', sa.Integer(), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('start_work_hour', sa.Time(), nullable=False),
+    sa.Column('end_work_hour', sa.Time(), nullable=False),
+    sa.Column('busy', sa.LargeBinary(), nullable=False),
+    sa.ForeignKeyConstraint(['worker_id'], ['workers.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('worker_id', 'date', name='uq_worker_day_occupancy_worker_date')
+    )
+
+
+def downgrade():
+    op.drop_table('worker_day_occupancy')
@@ -0,0 +1,27 @@
+"""branch booking window
+
+Revision ID: 0003_branch_booking_window
+Revises: 0002_worker_day_occupancy
+Create Date: 2026-10-18 04:19:39.517230
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003_branch_booking_window'
+down_revision = '0002_worker_day_occupancy'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing branches get the horizon they had before it was configurable.
+    with op.batch_alter_table('branches', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('max_booking_days', sa.Integer(), nullable=False, server_default='8'))
+
+
+def downgrade():
+    with op.batch_alter_table('branches', schema=None) as batch_op:
+        batch_op.drop_column('max_booking_days')
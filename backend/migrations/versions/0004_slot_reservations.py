@@ -0,0 +1,40 @@
+"""slot reservations
+
+Revision ID: 0004_slot_reservations
+Revises: 0003_branch_booking_window
+Create Date: 2026-10-18 04:19:39.930871
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004_slot_reservations'
+down_revision = '0003_branch_booking_window'
+branch_labels = None
+depends_on = None
+
+
+# Cells for upcoming appointments are filled by app.upgrade_database with
+# reservations.rebuild() after this revision is applied.
+def upgrade():
+    op.create_table('slot_reservations',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('worker_id', sa.Integer(), nullable=False),
+    sa.Column('slot_start', sa.DateTime(), nullable=False),
+    sa.Column('appointment_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['appointment_id'], ['appointments.id'], ),
+    sa.ForeignKeyConstraint(['worker_id'], ['workers.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('worker_id', 'slot_start', name='uq_slot_reservations_worker_slot')
+    )
+    with op.batch_alter_table('slot_reservations', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_slot_reservations_appointment_id'), ['appointment_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('slot_reservations', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_slot_reservations_appointment_id'))
+
+    op.drop_table('slot_reservations')
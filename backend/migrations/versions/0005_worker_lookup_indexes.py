@@ -0,0 +1,32 @@
+"""worker lookup indexes
+
+Revision ID: 0005_worker_lookup_indexes
+Revises: 0004_slot_reservations
+Create Date: 2026-10-18 04:19:40.348102
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005_worker_lookup_indexes'
+down_revision = '0004_slot_reservations'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('services_cost', schema=None) as batch_op:
+        batch_op.create_index('ix_services_cost_service_id_position_id', ['service_id', 'position_id'], unique=False)
+
+    with op.batch_alter_table('workers', schema=None) as batch_op:
+        batch_op.create_index('ix_workers_branch_id_position_id', ['branch_id', 'position_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('workers', schema=None) as batch_op:
+        batch_op.drop_index('ix_workers_branch_id_position_id')
+
+    with op.batch_alter_table('services_cost', schema=None) as batch_op:
+        batch_op.drop_index('ix_services_cost_service_id_position_id')
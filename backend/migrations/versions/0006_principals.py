@@ -0,0 +1,56 @@
+"""principals index and wider password hashes
+
+Revision ID: 0006_principals
+Revises: 0005_worker_lookup_indexes
+Create Date: 2026-10-18 04:19:40.761455
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006_principals'
+down_revision = '0005_worker_lookup_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # scrypt hashes do not fit the old 100 characters.
+    for table in ('admins', 'workers'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column('password', existing_type=sa.String(length=100), type_=sa.String(length=255), existing_nullable=False)
+
+    principals = op.create_table('principals',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('email', sa.String(length=100), nullable=False),
+    sa.Column('kind', sa.Enum('admin', 'worker', name='principal_kinds'), nullable=False),
+    sa.Column('principal_id', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('email'),
+    sa.UniqueConstraint('kind', 'principal_id', name='uq_principals_kind_principal_id')
+    )
+
+    # Existing accounts. Admins go first so they keep precedence over a
+    # worker that reuses the same email; that worker is left out and
+    # reported.
+    bind = op.get_bind()
+    rows = []
+    taken = set()
+    for kind, table in (('admin', 'admins'), ('worker', 'workers')):
+        for account_id, email in bind.execute(sa.text(f'SELECT id, email FROM {table} ORDER BY id')):
+            if email in taken:
+                print(f"Skipping {kind} {account_id}: email {email} is already used by another account.")
+                continue
+            rows.append({'email': email, 'kind': kind, 'principal_id': account_id})
+            taken.add(email)
+    if rows:
+        op.bulk_insert(principals, rows)
+
+
+def downgrade():
+    op.drop_table('principals')
+    for table in ('admins', 'workers'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column('password', existing_type=sa.String(length=255), type_=sa.String(length=100), existing_nullable=False)
@@ -0,0 +1,37 @@
+"""hot path indexes
+
+Revision ID: 0008_hot_path_indexes
+Revises: 0007_revoked_tokens
+Create Date: 2026-10-18 04:19:42.343417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008_hot_path_indexes'
+down_revision = '0007_revoked_tokens'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_appointments_worker_id_datetime', 'appointments', ['worker_id', 'datetime'])
+    op.create_index('ix_appointments_branch_id_datetime_status', 'appointments', ['branch_id', 'datetime', 'status'])
+    op.create_index('ix_services_cost_position_id_service_id', 'services_cost', ['position_id', 'service_id'])
+
+    # Duplicate work-hour rows for a day were possible before the unique
+    # index; keep the first one, which is the row scheduling already used.
+    op.execute(
+        'DELETE FROM worker_work_hours WHERE id NOT IN '
+        '(SELECT MIN(id) FROM worker_work_hours GROUP BY worker_id, date)'
+    )
+    op.create_index('uq_worker_work_hours_worker_id_date', 'worker_work_hours', ['worker_id', 'date'], unique=True)
+
+
+def downgrade():
+    op.drop_index('uq_worker_work_hours_worker_id_date', table_name='worker_work_hours')
+    op.drop_index('ix_services_cost_position_id_service_id', table_name='services_cost')
+    op.drop_index('ix_appointments_branch_id_datetime_status', table_name='appointments')
+    op.drop_index('ix_appointments_worker_id_datetime', table_name='appointments')
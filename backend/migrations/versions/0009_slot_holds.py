@@ -0,0 +1,43 @@
+"""slot holds
+
+Revision ID: 0009_slot_holds
+Revises: 0008_hot_path_indexes
+Create Date: 2026-10-18 05:02:11.418936
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0009_slot_holds'
+down_revision = '0008_hot_path_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('slot_holds',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('hold_id', sa.String(length=32), nullable=False),
+    sa.Column('worker_id', sa.Integer(), nullable=False),
+    sa.Column('slot_start', sa.DateTime(), nullable=False),
+    sa.Column('client', sa.String(length=64), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['worker_id'], ['workers.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('worker_id', 'slot_start', name='uq_slot_holds_worker_slot')
+    )
+    with op.batch_alter_table('slot_holds', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_slot_holds_client'), ['client'], unique=False)
+        batch_op.create_index(batch_op.f('ix_slot_holds_expires_at'), ['expires_at'], unique=False)
+        batch_op.create_index(batch_op.f('ix_slot_holds_hold_id'), ['hold_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('slot_holds', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_slot_holds_hold_id'))
+        batch_op.drop_index(batch_op.f('ix_slot_holds_expires_at'))
+        batch_op.drop_index(batch_op.f('ix_slot_holds_client'))
+
+    op.drop_table('slot_holds')
@@ -0,0 +1,26 @@
+"""branch catalog version
+
+Revision ID: 0011_branch_catalog_version
+Revises: 0010_idempotency_keys
+Create Date: 2026-10-18 05:26:03.114872
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0011_branch_catalog_version'
+down_revision = '0010_idempotency_keys'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('branches', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('catalog_version', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    with op.batch_alter_table('branches', schema=None) as batch_op:
+        batch_op.drop_column('catalog_version')
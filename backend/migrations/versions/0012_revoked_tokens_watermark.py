@@ -0,0 +1,28 @@
+"""revoked tokens watermark
+
+Revision ID: 0012_revoked_tokens_watermark
+Revises: 0011_branch_catalog_version
+Create Date: 2026-10-18 05:41:52.630187
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0012_revoked_tokens_watermark'
+down_revision = '0011_branch_catalog_version'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The table is recreated so SQLite never hands out a deleted row's id again.
+    with op.batch_alter_table('revoked_tokens', schema=None, recreate='always',
+                              table_kwargs={'sqlite_autoincrement': True}) as batch_op:
+        batch_op.create_index(batch_op.f('ix_revoked_tokens_revoked_at'), ['revoked_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('revoked_tokens', schema=None, recreate='always') as batch_op:
+        batch_op.drop_index(batch_op.f('ix_revoked_tokens_revoked_at'))
@@ -0,0 +1,26 @@
+"""occupancy version
+
+Revision ID: 0013_occupancy_version
+Revises: 0012_revoked_tokens_watermark
+Create Date: 2026-10-18 06:12:40.538106
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0013_occupancy_version'
+down_revision = '0012_revoked_tokens_watermark'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('worker_day_occupancy', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.BigInteger(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    with op.batch_alter_table('worker_day_occupancy', schema=None) as batch_op:
+        batch_op.drop_column('version')
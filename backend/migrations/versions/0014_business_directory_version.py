@@ -0,0 +1,26 @@
+"""business directory version
+
+Revision ID: 0014_business_directory_version
+Revises: 0013_occupancy_version
+Create Date: 2026-10-18 06:31:17.804552
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0014_business_directory_version'
+down_revision = '0013_occupancy_version'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('businesses', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('directory_version', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    with op.batch_alter_table('businesses', schema=None) as batch_op:
+        batch_op.drop_column('directory_version')
@@ -1,6 +1,7 @@
 from flask_sqlalchemy import SQLAlchemy
+from database import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 business_owners = db.Table(
     'business_owners',
@@ -26,3 +27,9 @@ from .service import Service
 from .service_cost import ServiceCost
 from .worker_work_hours import WorkerWorkHours
 from .appointment import Appointment
+from .worker_day_occupancy import WorkerDayOccupancy
+from .slot_reservation import SlotReservation
+from .slot_hold import SlotHold
+from .idempotency_key import IdempotencyKey
+from .principal import Principal
+from .revoked_token import RevokedToken
@@ -10,3 +10,8 @@ class Appointment(db.Model):
     datetime = db.Column(db.DateTime, nullable=False)
     customer_name = db.Column(db.String(40), nullable=False)
     customer_phone = db.Column(db.String(20), nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_appointments_worker_id_datetime', 'worker_id', 'datetime'),
+        db.Index('ix_appointments_branch_id_datetime_status', 'branch_id', 'datetime', 'status'),
+    )
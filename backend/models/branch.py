@@ -10,6 +10,8 @@ class Branch(db.Model):
     phone_number = db.Column(db.String(20), nullable=False)
     start_work_hour = db.Column(db.Time, nullable=False)
     end_work_hour = db.Column(db.Time, nullable=False)
+    max_booking_days = db.Column(db.Integer, nullable=False, default=8)  # how far ahead clients may book
+    catalog_version = db.Column(db.Integer, nullable=False, default=0)  # bumped on every services_by_position change
     workers = db.relationship('Worker', backref='branch', lazy=True)
     positions = db.relationship('Position', backref='branch', lazy=True)
     services = db.relationship('Service', backref='branch', lazy=True)
@@ -5,5 +5,6 @@ class Business(db.Model):
     __tablename__ = 'businesses'
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
+    directory_version = db.Column(db.Integer, nullable=False, default=0)  # bumped on every /cities/<id> change
     owners = db.relationship('Admin', secondary=business_owners, back_populates='businesses')
     branches = db.relationship('Branch', backref='business', lazy=True, cascade='all, delete-orphan')
@@ -0,0 +1,40 @@
+from sqlalchemy import event, inspect
+from . import db
+from .admin import Admin
+from .worker import Worker
+
+class Principal(db.Model):
+    # Email -> account index shared by admins and workers, kept in sync by
+    # the mapper events below so login resolves an account with one lookup.
+    __tablename__ = 'principals'
+    id = db.Column(db.Integer, primary_key=True)
+    email = db.Column(db.String(100), unique=True, nullable=False)
+    kind = db.Column(db.Enum('admin', 'worker', name='principal_kinds'), nullable=False)
+    principal_id = db.Column(db.Integer, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('kind', 'principal_id', name='uq_principals_kind_principal_id'),
+    )
+
+
+def _listen(model, kind):
+    table = Principal.__table__
+
+    @event.listens_for(model, 'after_insert')
+    def after_insert(mapper, connection, target):
+        connection.execute(table.insert().values(email=target.email, kind=kind, principal_id=target.id))
+
+    @event.listens_for(model, 'after_update')
+    def after_update(mapper, connection, target):
+        if inspect(target).attrs.email.history.has_changes():
+            connection.execute(table.update().where(
+                table.c.kind == kind, table.c.principal_id == target.id
+            ).values(email=target.email))
+
+    @event.listens_for(model, 'after_delete')
+    def after_delete(mapper, connection, target):
+        connection.execute(table.delete().where(table.c.kind == kind, table.c.principal_id == target.id))
+
+
+_listen(Admin, 'admin')
+_listen(Worker, 'worker')
@@ -0,0 +1,11 @@
+from . import db
+
+class RevokedToken(db.Model):
+    # `key` is a token jti, a login family ("family:<id>") or a whole account
+    # ("subject:<kind>:<id>"); tokens issued at or before revoked_at are refused.
+    __tablename__ = 'revoked_tokens'
+    __table_args__ = {'sqlite_autoincrement': True}
+    id = db.Column(db.Integer, primary_key=True)
+    key = db.Column(db.String(100), unique=True, nullable=False)
+    revoked_at = db.Column(db.Float, nullable=False, index=True)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
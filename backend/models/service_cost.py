@@ -6,3 +6,8 @@ class ServiceCost(db.Model):
     position_id = db.Column(db.Integer, db.ForeignKey('positions.id'), nullable=False)
     service_id = db.Column(db.Integer, db.ForeignKey('services.id'), nullable=False)
     price = db.Column(db.Integer, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_services_cost_service_id_position_id', 'service_id', 'position_id'),
+        db.Index('ix_services_cost_position_id_service_id', 'position_id', 'service_id'),
+    )
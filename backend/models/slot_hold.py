@@ -0,0 +1,16 @@
+from . import db
+
+class SlotHold(db.Model):
+    # One row per occupancy cell of a hold, mirroring slot_reservations, so
+    # overlapping holds collide on the unique index in every process.
+    __tablename__ = 'slot_holds'
+    id = db.Column(db.Integer, primary_key=True)
+    hold_id = db.Column(db.String(32), nullable=False, index=True)
+    worker_id = db.Column(db.Integer, db.ForeignKey('workers.id'), nullable=False)
+    slot_start = db.Column(db.DateTime, nullable=False)
+    client = db.Column(db.String(64), nullable=False, index=True)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    __table_args__ = (
+        db.UniqueConstraint('worker_id', 'slot_start', name='uq_slot_holds_worker_slot'),
+    )
@@ -0,0 +1,12 @@
+from . import db
+
+class SlotReservation(db.Model):
+    __tablename__ = 'slot_reservations'
+    id = db.Column(db.Integer, primary_key=True)
+    worker_id = db.Column(db.Integer, db.ForeignKey('workers.id'), nullable=False)
+    slot_start = db.Column(db.DateTime, nullable=False)
+    appointment_id = db.Column(db.Integer, db.ForeignKey('appointments.id'), nullable=False, index=True)
+
+    __table_args__ = (
+        db.UniqueConstraint('worker_id', 'slot_start', name='uq_slot_reservations_worker_slot'),
+    )
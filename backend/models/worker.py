@@ -8,4 +8,8 @@ class Worker(db.Model):
     branch_id = db.Column(db.Integer, db.ForeignKey('branches.id'), nullable=False)
     work_hours = db.relationship('WorkerWorkHours', backref='worker', lazy=True)
     email = db.Column(db.String(100), unique=True, nullable=False)
-    password = db.Column(db.String(100), nullable=False)
+    password = db.Column(db.String(255), nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_workers_branch_id_position_id', 'branch_id', 'position_id'),
+    )
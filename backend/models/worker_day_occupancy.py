@@ -0,0 +1,15 @@
+from . import db
+
+class WorkerDayOccupancy(db.Model):
+    __tablename__ = 'worker_day_occupancy'
+    id = db.Column(db.Integer, primary_key=True)
+    worker_id = db.Column(db.Integer, db.ForeignKey('workers.id'), nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    start_work_hour = db.Column(db.Time, nullable=False)
+    end_work_hour = db.Column(db.Time, nullable=False)
+    busy = db.Column(db.LargeBinary, nullable=False)  # one bit per occupancy.CELL_MINUTES cell of the day
+    version = db.Column(db.BigInteger, nullable=False, default=0)  # changes whenever the row is rewritten
+
+    __table_args__ = (
+        db.UniqueConstraint('worker_id', 'date', name='uq_worker_day_occupancy_worker_date'),
+    )
@@ -7,3 +7,7 @@ class WorkerWorkHours(db.Model):
     date = db.Column(db.Date, nullable=False)
     start_work_hour = db.Column(db.Time, nullable=False)
     end_work_hour = db.Column(db.Time, nullable=False)
+
+    __table_args__ = (
+        db.Index('uq_worker_work_hours_worker_id_date', 'worker_id', 'date', unique=True),
+    )
@@ -0,0 +1,104 @@
+import time
+from datetime import datetime
+from sqlalchemy import insert
+from models import db, Appointment, WorkerWorkHours, WorkerDayOccupancy
+import scheduling
+
+BITMAP_BYTES = scheduling.CELLS_PER_DAY // 8
+
+
+def build_busy_bitmap(single_date, intervals):
+    midnight = datetime.combine(single_date, datetime.min.time())
+    busy = 0
+    for start, end in intervals:
+        busy |= scheduling.cell_mask(
+            int((start - midnight).total_seconds()) // 60,
+            -(-int((end - midnight).total_seconds()) // 60)
+        )
+    return busy.to_bytes(BITMAP_BYTES, 'little')
+
+
+def next_version(version):
+    # Millisecond stamps rather than a plain counter, so a worker-day whose
+    # row was deleted and later recreated never reuses an old version.
+    return max(version + 1, int(time.time() * 1000))
+
+
+def refresh_worker_days(keys):
+    # Recomputes the index rows for the given (worker_id, date) pairs from
+    # the current session state; callers commit together with their change.
+    keys = set(keys)
+    if not keys:
+        return
+
+    worker_ids = {worker_id for worker_id, _ in keys}
+    start_date = min(day for _, day in keys)
+    end_date = max(day for _, day in keys)
+
+    # Lock the existing rows first so concurrent bookings for the same
+    # worker-day recompute one after another instead of overwriting each
+    # other's bitmap; other worker-days are unaffected.
+    existing = {
+        (row.worker_id, row.date): row
+        for row in WorkerDayOccupancy.query.filter(
+            WorkerDayOccupancy.worker_id.in_(worker_ids),
+            WorkerDayOccupancy.date >= start_date,
+            WorkerDayOccupancy.date <= end_date
+        ).with_for_update().all()
+    }
+    work_hours = scheduling.load_work_hours(worker_ids, start_date, end_date)
+    intervals = scheduling.load_appointment_intervals(worker_ids, start_date, end_date)
+
+    new_rows = []
+    for key in keys:
+        wh = work_hours.get(key)
+        row = existing.get(key)
+        if not wh:
+            if row:
+                db.session.delete(row)
+            continue
+
+        busy = build_busy_bitmap(key[1], intervals.get(key, []))
+        if not row:
+            # New rows go in as one executemany below rather than one
+            # INSERT ... RETURNING per worker-day from the ORM flush.
+            new_rows.append({
+                'worker_id': key[0],
+                'date': key[1],
+                'start_work_hour': wh.start_work_hour,
+                'end_work_hour': wh.end_work_hour,
+                'busy': busy,
+                'version': next_version(0)
+            })
+            continue
+        row.start_work_hour = wh.start_work_hour
+        row.end_work_hour = wh.end_work_hour
+        row.busy = busy
+        row.version = next_version(row.version)
+
+    if new_rows:
+        db.session.execute(insert(WorkerDayOccupancy), new_rows)
+
+
+def refresh_worker_day(worker_id, single_date):
+    refresh_worker_days([(worker_id, single_date)])
+
+
+def refresh_service_days(service_id):
+    rows = db.session.query(Appointment.worker_id, Appointment.datetime).filter(
+        Appointment.service_id == service_id,
+        Appointment.status != 'Canceled'
+    ).all()
+    refresh_worker_days((worker_id, appt_datetime.date()) for worker_id, appt_datetime in rows)
+
+
+def delete_worker_days(worker_id):
+    WorkerDayOccupancy.query.filter_by(worker_id=worker_id).delete()
+
+
+def rebuild_index():
+    WorkerDayOccupancy.query.delete()
+
+    keys = [tuple(key) for key in db.session.query(WorkerWorkHours.worker_id, WorkerWorkHours.date).distinct()]
+    refresh_worker_days(keys)
+    return len(keys)
@@ -0,0 +1,80 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.security import check_password_hash, generate_password_hash
+
+# Changing the method or its cost parameters makes every stored hash that
+# does not match get rehashed the next time its owner logs in.
+PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+PASSWORD_POOL_WORKERS = int(os.environ.get('PASSWORD_POOL_WORKERS', min(4, os.cpu_count() or 1)))
+PASSWORD_POOL_QUEUE = int(os.environ.get('PASSWORD_POOL_QUEUE', 32))
+PASSWORD_VERIFY_TIMEOUT = 10
+
+
+class PoolBusy(Exception):
+    pass
+
+
+def hash_password(password):
+    return generate_password_hash(password, method=PASSWORD_HASH_METHOD)
+
+
+def needs_rehash(password_hash):
+    return password_hash.split('$', 1)[0] != PASSWORD_HASH_METHOD
+
+
+def _verify(password_hash, password):
+    if not check_password_hash(password_hash, password):
+        return False, None
+    return True, hash_password(password) if needs_rehash(password_hash) else None
+
+
+class PasswordPool:
+    # scrypt and pbkdf2 release the GIL, so a few threads keep hashing off
+    # the request threads. Work beyond `max_pending` is refused instead of
+    # queued, so a login burst cannot pile up behind the booking endpoints.
+    def __init__(self, workers=PASSWORD_POOL_WORKERS, max_pending=PASSWORD_POOL_QUEUE):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password')
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.peak_pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def _done(self, future):
+        with self._lock:
+            self.pending -= 1
+            self.completed += 1
+
+    def submit(self, fn, *args):
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise PoolBusy()
+            self.pending += 1
+            self.peak_pending = max(self.peak_pending, self.pending)
+        future = self.executor.submit(fn, *args)
+        future.add_done_callback(self._done)
+        return future
+
+    def verify(self, password_hash, password):
+        # Returns (matches, new_hash); new_hash is set when the stored hash
+        # uses outdated parameters.
+        return self.submit(_verify, password_hash, password).result(PASSWORD_VERIFY_TIMEOUT)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'max_pending': self.max_pending,
+                'pending': self.pending,
+                'queued': max(0, self.pending - self.workers),
+                'peak_pending': self.peak_pending,
+                'completed': self.completed,
+                'rejected': self.rejected
+            }
+
+
+password_pool = PasswordPool()
@@ -0,0 +1,70 @@
+from flask import g
+from flask_jwt_extended import get_jwt, get_jwt_identity
+from sqlalchemy import and_
+from models import db, Admin, Principal, Worker
+
+_MISSING = object()
+
+
+def admin_claims(admin):
+    # Owner permissions are not carried in the token; they come from
+    # acl.get_owner_acl, which tracks businesses added after login.
+    return {'role': admin.role, 'branch_id': admin.branch_id}
+
+
+def worker_claims(worker):
+    return {'role': 'worker', 'branch_id': worker.branch_id}
+
+
+def find_by_email(email):
+    row = db.session.query(Admin, Worker).select_from(Principal).outerjoin(
+        Admin, and_(Principal.kind == 'admin', Admin.id == Principal.principal_id)
+    ).outerjoin(
+        Worker, and_(Principal.kind == 'worker', Worker.id == Principal.principal_id)
+    ).filter(Principal.email == email).first()
+    if not row:
+        return None
+    return row[0] or row[1]
+
+
+def current_role():
+    # Tokens issued before claims were added carry no role; fall back to the
+    # database for those until they expire.
+    role = get_jwt().get('role')
+    if role:
+        return role
+    admin = current_admin()
+    if admin:
+        return admin.role
+    return 'worker' if current_worker() else None
+
+
+def claim(name, default=None):
+    return get_jwt().get(name, default)
+
+
+def _load(attr, model):
+    principal = g.get(attr, _MISSING)
+    if principal is _MISSING:
+        try:
+            principal = db.session.get(model, int(get_jwt_identity()))
+        except Exception as e:
+            print(f"JWT identity error: {e}")
+            principal = None
+        setattr(g, attr, principal)
+    return principal
+
+
+def current_admin():
+    # Admin and worker ids share the same identity space, so a worker token
+    # must never resolve to an admin row.
+    if get_jwt().get('role') == 'worker':
+        return None
+    return _load('current_admin', Admin)
+
+
+def current_worker():
+    role = get_jwt().get('role')
+    if role and role != 'worker':
+        return None
+    return _load('current_worker', Worker)
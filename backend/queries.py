@@ -0,0 +1,15 @@
+from models import db, Worker, ServiceCost
+
+
+def qualifying_workers_query(branch_id, service_id, position_id=None):
+    # Workers of the branch whose position has a price for the service.
+    # Served by ix_workers_branch_id_position_id and
+    # ix_services_cost_service_id_position_id.
+    position_ids = db.session.query(ServiceCost.position_id).filter(ServiceCost.service_id == service_id)
+    query = Worker.query.filter(
+        Worker.branch_id == branch_id,
+        Worker.position_id.in_(position_ids)
+    )
+    if position_id:
+        query = query.filter(Worker.position_id == position_id)
+    return query.order_by(Worker.id)
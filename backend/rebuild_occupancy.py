@@ -0,0 +1,18 @@
+import sys
+import os
+
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from app import create_app, upgrade_database
+from models import db
+import occupancy
+
+app = create_app()
+
+with app.app_context():
+    upgrade_database()
+
+    count = occupancy.rebuild_index()
+    db.session.commit()
+    print(f"Occupancy index rebuilt for {count} worker-days.")
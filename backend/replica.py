@@ -0,0 +1,115 @@
+import sqlite3
+import threading
+import time
+from flask import request
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+from models import db
+
+# (path prefix, tolerates lag). Reports may trail the primary by one sync;
+# the public catalog only reads from the replica once that has caught up
+# with every commit made here. caught_up() knows nothing of other processes'
+# commits, so reads that fill process caches use database.on_primary.
+REPLICA_ROUTES = (
+    ('/owner/reports/', True),
+    ('/cities/', False),
+    ('/branches/', False),
+)
+
+
+class ReplicaState:
+    def __init__(self):
+        self.last_write = 0.0
+        self.synced_at = None
+        self._lock = threading.Lock()
+
+    def wrote(self):
+        with self._lock:
+            self.last_write = time.monotonic()
+
+    def synced(self, started_at):
+        with self._lock:
+            self.synced_at = started_at
+
+    def caught_up(self, lag_seconds):
+        # With a local backup sync we know exactly what the copy contains;
+        # an external replica is trusted once the last write is lag_seconds old.
+        with self._lock:
+            if self.synced_at is not None:
+                return self.synced_at >= self.last_write
+            return time.monotonic() - self.last_write >= lag_seconds
+
+
+replica_state = ReplicaState()
+
+
+@event.listens_for(Session, 'after_commit')
+def _record_write(session):
+    if session.info.get('wrote'):
+        replica_state.wrote()
+
+
+def sqlite_path(url):
+    url = make_url(url)
+    if url.get_backend_name() != 'sqlite' or url.database in (None, '', ':memory:'):
+        return None
+    return url.database
+
+
+class SQLiteReplicaSync:
+    # Stands in for real replication locally: copies the primary file onto
+    # the replica with SQLite's online backup API every `interval` seconds.
+    def __init__(self, primary_path, replica_path, interval):
+        self.primary_path = primary_path
+        self.replica_path = replica_path
+        self.interval = interval
+        self._stop = threading.Event()
+        self.thread = threading.Thread(target=self._run, name='replica-sync', daemon=True)
+
+    def sync(self):
+        started_at = time.monotonic()
+        source = sqlite3.connect(self.primary_path)
+        target = sqlite3.connect(self.replica_path)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
+        replica_state.synced(started_at)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.sync()
+            except sqlite3.Error as e:
+                print(f"Replica sync failed: {e}")
+
+    def start(self):
+        self.sync()
+        self.thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+
+def init_app(app):
+    if 'replica' not in app.config.get('SQLALCHEMY_BINDS', {}):
+        return
+
+    @app.before_request
+    def route_reads_to_replica():
+        if request.method != 'GET':
+            return
+        for prefix, tolerates_lag in REPLICA_ROUTES:
+            if request.path.startswith(prefix):
+                if tolerates_lag or replica_state.caught_up(app.config['REPLICA_LAG_SECONDS']):
+                    db.session.info['use_replica'] = True
+                return
+
+    interval = app.config['REPLICA_SYNC_SECONDS']
+    primary_path = sqlite_path(app.config['SQLALCHEMY_DATABASE_URI'])
+    replica_path = sqlite_path(app.config['SQLALCHEMY_BINDS']['replica'])
+    if interval and primary_path and replica_path:
+        app.extensions['replica_sync'] = SQLiteReplicaSync(primary_path, replica_path, interval)
+        app.extensions['replica_sync'].start()
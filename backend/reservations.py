@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta
+from sqlalchemy import insert
+from models import db, Appointment, Service, SlotReservation
+import scheduling
+
+
+def reservation_cells(start, duration_minutes):
+    # Every occupancy cell the appointment touches, so two bookings that
+    # overlap by any amount collide on at least one (worker_id, slot_start).
+    midnight = datetime.combine(start.date(), datetime.min.time())
+    first = int((start - midnight).total_seconds()) // 60 // scheduling.CELL_MINUTES
+    end = start + timedelta(minutes=duration_minutes)
+    last = -(-int((end - midnight).total_seconds()) // 60 // scheduling.CELL_MINUTES)
+    return [midnight + timedelta(minutes=cell * scheduling.CELL_MINUTES) for cell in range(first, last)]
+
+
+def has_conflict(worker_id, start, duration_minutes, exclude_appointment_id=None):
+    # Probes exactly the cells reserve() would insert, through the
+    # (worker_id, slot_start) unique index, instead of loading the day.
+    query = db.session.query(SlotReservation.id).filter(
+        SlotReservation.worker_id == worker_id,
+        SlotReservation.slot_start.in_(reservation_cells(start, duration_minutes))
+    )
+    if exclude_appointment_id is not None:
+        query = query.filter(SlotReservation.appointment_id != exclude_appointment_id)
+    return db.session.query(query.exists()).scalar()
+
+
+def reserve(appointment, duration_minutes):
+    # Raises IntegrityError when another transaction holds any of the cells;
+    # the caller rolls back and answers 409. All cells go in as a single
+    # executemany rather than one INSERT ... RETURNING per cell.
+    if appointment.id is None:
+        db.session.flush()
+    db.session.execute(insert(SlotReservation), [
+        {'worker_id': appointment.worker_id, 'slot_start': cell, 'appointment_id': appointment.id}
+        for cell in reservation_cells(appointment.datetime, duration_minutes)
+    ])
+
+
+def release(appointment):
+    SlotReservation.query.filter_by(appointment_id=appointment.id).delete()
+
+
+def rereserve_service(service):
+    # Re-cells upcoming appointments after a duration change.
+    appointments = Appointment.query.filter(
+        Appointment.service_id == service.id,
+        Appointment.status != 'Canceled',
+        Appointment.datetime >= datetime.now()
+    ).all()
+    for appointment in appointments:
+        release(appointment)
+    for appointment in appointments:
+        reserve(appointment, service.duration)
+
+
+def release_service(service_id):
+    appointment_ids = db.session.query(Appointment.id).filter(Appointment.service_id == service_id)
+    SlotReservation.query.filter(SlotReservation.appointment_id.in_(appointment_ids)).delete(synchronize_session=False)
+
+
+def rebuild():
+    # Cells for every upcoming appointment. Bookings made before reservations
+    # existed may overlap; the earlier one keeps the shared cells.
+    SlotReservation.query.delete()
+    rows = db.session.query(Appointment.id, Appointment.worker_id, Appointment.datetime, Service.duration).join(
+        Service, Appointment.service_id == Service.id
+    ).filter(
+        Appointment.status != 'Canceled',
+        Appointment.datetime >= datetime.now()
+    ).order_by(Appointment.datetime, Appointment.id)
+
+    taken = set()
+    cells = []
+    for appointment_id, worker_id, start, duration in rows:
+        for cell in reservation_cells(start, duration):
+            if (worker_id, cell) in taken:
+                continue
+            taken.add((worker_id, cell))
+            cells.append({'worker_id': worker_id, 'slot_start': cell, 'appointment_id': appointment_id})
+    if cells:
+        db.session.execute(insert(SlotReservation), cells)
+    return len(cells)
@@ -1,11 +1,16 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token
-from werkzeug.security import check_password_hash
-from models import Admin, Worker
-from datetime import timedelta
+from flask_jwt_extended import jwt_required, get_jwt, get_jwt_identity
+from concurrent.futures import TimeoutError
+from sqlalchemy.exc import IntegrityError
+from models import db, Admin
+from passwords import password_pool, PoolBusy
+from tokens import issue_tokens, revocation_list
+import principal
 
 auth_bp = Blueprint('auth', __name__)
 
+CLAIM_NAMES = ('role', 'branch_id')
+
 @auth_bp.route('/login', methods=['POST'])
 def login():
     data = request.get_json()
@@ -15,19 +20,47 @@ def login():
     if not email or not password:
         return jsonify({'error': 'Email and password are required'}), 400
 
-    admin = Admin.query.filter_by(email=email).first()
-    worker = Worker.query.filter_by(email=email).first()
-    if admin:
-        if check_password_hash(admin.password, password):
-            access_token = create_access_token(identity=str(admin.id), expires_delta=timedelta(minutes=30))
-            return jsonify({'access_token': access_token, 'role': admin.role, 'id': admin.id}), 200
-        else:
-            return jsonify({'error': 'Invalid password'}), 401
-    elif worker:
-        if check_password_hash(worker.password, password):
-            access_token = create_access_token(identity=str(worker.id), expires_delta=timedelta(minutes=30))
-            return jsonify({'access_token': access_token, 'role': 'worker', 'id': worker.id}), 200
-        else:
-            return jsonify({'error': 'Invalid password'}), 401
-    else:
+    account = principal.find_by_email(email)
+    if not account:
         return jsonify({'error': 'User not found'}), 404
+
+    try:
+        valid, new_hash = password_pool.verify(account.password, password)
+    except (PoolBusy, TimeoutError):
+        response = jsonify({'error': 'Too many login attempts, try again shortly'})
+        response.headers['Retry-After'] = '1'
+        return response, 503
+    if not valid:
+        return jsonify({'error': 'Invalid password'}), 401
+    if new_hash:
+        account.password = new_hash
+        db.session.commit()
+
+    if isinstance(account, Admin):
+        claims = principal.admin_claims(account)
+    else:
+        claims = principal.worker_claims(account)
+    return jsonify(dict(issue_tokens(str(account.id), claims), role=claims['role'], id=account.id)), 200
+
+@auth_bp.route('/refresh', methods=['POST'])
+@jwt_required(refresh=True)
+def refresh():
+    # Rotation: the presented refresh token is spent and a new pair is issued
+    # with the same claims, without touching the account tables.
+    payload = get_jwt()
+    revocation_list.revoke_token(payload)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': 'Refresh token has already been used'}), 401
+
+    claims = {name: payload.get(name) for name in CLAIM_NAMES}
+    return jsonify(issue_tokens(get_jwt_identity(), claims, payload.get('family'))), 200
+
+@auth_bp.route('/logout', methods=['POST'])
+@jwt_required(refresh=True)
+def logout():
+    revocation_list.revoke_family(get_jwt())
+    db.session.commit()
+    return jsonify({'message': 'Logged out'}), 200
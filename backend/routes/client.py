@@ -1,33 +1,108 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, make_response, Response, stream_with_context
 from collections import defaultdict
-from datetime import datetime, timedelta, time
-from models import db, Branch, Business, Worker, Service, ServiceCost, WorkerWorkHours, Appointment, Position
+import json
+from datetime import datetime, date, timedelta, time
+from models import db, Branch, Business, Worker, Service, ServiceCost, WorkerWorkHours, WorkerDayOccupancy, Appointment, Position
+import scheduling
+import catalog
+import queries
+import confirmations
+from instrumentation import query_budget
+import occupancy
+import reservations
+import holds
+from idempotency import idempotent
+from sqlalchemy.exc import IntegrityError
 
 client_bp = Blueprint('client', __name__)
 
+def not_modified(etag):
+    response = make_response('', 304)
+    response.set_etag(etag)
+    response.vary.add('Accept')
+    return response
+
+def with_etag(response, etag):
+    # JSON and NDJSON share a URL, so caches must key on Accept too.
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.vary.add('Accept')
+    return response
+
+def wants_ndjson():
+    return request.args.get('format') == 'ndjson' or request.accept_mimetypes.best == 'application/x-ndjson'
+
+def parse_booking_window(branch):
+    # Reads from/to/days from the query string; defaults to the historical
+    # 8-day window and never reaches past the branch's booking horizon.
+    today = datetime.today().date()
+    max_days = branch.max_booking_days or scheduling.BOOKING_DAYS
+    try:
+        start_date = date.fromisoformat(request.args['from']) if 'from' in request.args else today
+        end_date = date.fromisoformat(request.args['to']) if 'to' in request.args else None
+    except ValueError:
+        return None, (jsonify({'error': 'Invalid date format'}), 400)
+
+    days = None
+    if 'days' in request.args:
+        days = request.args.get('days', type=int)
+        if days is None or days < 1:
+            return None, (jsonify({'error': 'days must be a positive integer'}), 400)
+    if end_date and days:
+        return None, (jsonify({'error': 'Use either to or days, not both'}), 400)
+    if not end_date:
+        days = days or min(scheduling.BOOKING_DAYS, max_days)
+        end_date = start_date + timedelta(days=days - 1)
+
+    if start_date < today:
+        return None, (jsonify({'error': 'from cannot be in the past'}), 400)
+    if end_date < start_date:
+        return None, (jsonify({'error': 'to must not be before from'}), 400)
+    if end_date >= today + timedelta(days=max_days):
+        return None, (jsonify({'error': f'Bookings are open only {max_days} days ahead'}), 400)
+
+    return (start_date, end_date), None
+
+def check_offered_slot(worker, service, start):
+    # A hold pins a slot before the customer commits to anything, so it must
+    # be a slot the availability endpoints could have offered.
+    now = datetime.now()
+    if start <= now:
+        return jsonify({'error': 'Time slot is in the past'}), 400
+    if start.second or start.microsecond or start.minute % scheduling.CELL_MINUTES:
+        return jsonify({'error': f'Time must be a multiple of {scheduling.CELL_MINUTES} minutes'}), 400
+    max_days = worker.branch.max_booking_days or scheduling.BOOKING_DAYS
+    if start.date() >= now.date() + timedelta(days=max_days):
+        return jsonify({'error': f'Bookings are open only {max_days} days ahead'}), 400
+    if service.branch_id != worker.branch_id or not ServiceCost.query.filter_by(position_id=worker.position_id, service_id=service.id).first():
+        return jsonify({'error': 'Worker does not provide this service'}), 400
+
+    day = WorkerDayOccupancy.query.filter_by(worker_id=worker.id, date=start.date()).first()
+    end = start + timedelta(minutes=service.duration)
+    if not day or start.time() < day.start_work_hour or end > datetime.combine(start.date(), day.end_work_hour):
+        return jsonify({'error': "Outside the worker's working hours"}), 400
+    return None
+
 @client_bp.route('/cities/<int:id>', methods=['GET'])
+@query_budget(3)
 def get_branches_by_locality(id):
-    business = Business.query.filter_by(id=id).first()
-    if not business:
+    directory = catalog.get_business_directory(id)
+    if not directory:
         return jsonify({'error': 'Business not found'}), 404
 
-    branches = Branch.query.filter_by(business_id=id).all()
-
-    grouped = defaultdict(list)
-    for branch in branches:
-        grouped[branch.locality].append({
-            'id': branch.id,
-            'name': branch.name,
-            'address': branch.address,
-            'phone_number': branch.phone_number,
-            'start_work_hour': branch.start_work_hour.strftime('%H:%M'),
-            'end_work_hour': branch.end_work_hour.strftime('%H:%M')
-        })
+    body, gzipped, etag = directory
+    use_gzip = 'gzip' in request.accept_encodings
+    if use_gzip:
+        # Strong ETags are per representation.
+        etag += '-gzip'
+    if etag in request.if_none_match:
+        return not_modified(etag)
 
-    return jsonify({
-        'business_name': business.name,
-        'branches': grouped
-    })
+    response = Response(gzipped if use_gzip else body, mimetype='application/json')
+    if use_gzip:
+        response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    return with_etag(response, etag)
 
 @client_bp.route('/branches/<int:branch_id>/services/<int:service_id>/workers', methods=['GET'])
 def get_workers_by_branch_and_service(branch_id, service_id):
@@ -37,21 +112,14 @@ def get_workers_by_branch_and_service(branch_id, service_id):
 
     position_id = request.args.get('position_id', type=int)
 
-    # Get all workers in the branch
-    workers = Worker.query.filter_by(branch_id=branch_id).all()
-
-    if position_id:
-
-        filtered_workers = [w for w in workers if w.position_id == position_id]
-    else:
-
-        service_costs = ServiceCost.query.filter_by(service_id=service_id).all()
-        position_ids_for_service = {sc.position_id for sc in service_costs}
-
-        filtered_workers = [w for w in workers if w.position_id in position_ids_for_service]
+    workers = queries.qualifying_workers_query(branch_id, service_id, position_id).with_entities(
+        Worker.id,
+        Worker.name,
+        Worker.position_id
+    ).all()
 
     result = []
-    for w in filtered_workers:
+    for w in workers:
         result.append({
             'id': w.id,
             'name': w.name,
@@ -77,34 +145,14 @@ def get_workers_by_branch(branch_id):
     return jsonify(result)
 
 @client_bp.route('/workers/<int:worker_id>/services', methods=['GET'])
+@query_budget(3)
 def get_services_by_worker(worker_id):
     worker = Worker.query.get(worker_id)
     if not worker:
         return jsonify({'error': 'Worker not found'}), 404
 
 
-    service_costs = ServiceCost.query.filter_by(position_id=worker.position_id).all()
-    services = []
-    for sc in service_costs:
-        service = Service.query.get(sc.service_id)
-        if service:
-            services.append({
-                'id': service.id,
-                'name': service.name,
-                'duration': service.duration,
-                'price': sc.price
-            })
-    return jsonify(services)
-
-def get_time_slots(start_time, end_time, duration_minutes):
-    slots = []
-    current = datetime.combine(datetime.today(), start_time)
-    end = datetime.combine(datetime.today(), end_time)
-    delta = timedelta(minutes=duration_minutes)
-    while current + delta <= end:
-        slots.append(current.time().strftime('%H:%M'))
-        current += delta
-    return slots
+    return jsonify(catalog.get_position_menu(worker.position_id))
 
 @client_bp.route('/workers/<int:worker_id>/services/<int:service_id>/available_slots', methods=['GET'])
 def get_available_slots(worker_id, service_id):
@@ -116,87 +164,174 @@ def get_available_slots(worker_id, service_id):
     if not service:
         return jsonify({'error': 'Service not found'}), 404
 
+    window, error = parse_booking_window(worker.branch)
+    if error:
+        return error
+    start_date, end_date = window
+
+    now = datetime.now()
+    ndjson = wants_ndjson()
+    held = scheduling.load_held_cells([worker_id], start_date, end_date)
+    versions = scheduling.load_day_versions([worker_id], start_date, end_date)
+    etag = scheduling.availability_etag([worker_id], service, start_date, end_date, versions, now, 'ndjson' if ndjson else 'json', held)
+    if etag in request.if_none_match:
+        return not_modified(etag)
+
+    if ndjson:
+        def generate():
+            for single_date, slots_by_worker in scheduling.iter_available_days([worker_id], service, start_date, end_date, versions, now, held):
+                if worker_id in slots_by_worker:
+                    yield json.dumps({'date': single_date.strftime('%Y-%m-%d'), 'slots': slots_by_worker[worker_id]}) + '\n'
+        return with_etag(Response(stream_with_context(generate()), mimetype='application/x-ndjson'), etag)
+
+    available_slots = scheduling.get_available_slots([worker_id], service, start_date, end_date, versions, now, held)
+
+    return with_etag(jsonify(available_slots[worker_id]), etag)
+
+@client_bp.route('/branches/<int:branch_id>/services/<int:service_id>/availability', methods=['GET'])
+@query_budget(7)
+def get_branch_availability(branch_id, service_id):
+    branch = Branch.query.get(branch_id)
+    if not branch:
+        return jsonify({'error': 'Branch not found'}), 404
 
-    today = datetime.today().date()
-    now_time = datetime.now().time()
-    end_date = today + timedelta(days=7)
+    service = Service.query.get(service_id)
+    if not service:
+        return jsonify({'error': 'Service not found'}), 404
 
-    available_slots = defaultdict(list)
+    position_id = request.args.get('position_id', type=int)
+    workers = queries.qualifying_workers_query(branch_id, service_id, position_id).all()
+    worker_ids = [w.id for w in workers]
+
+    window, error = parse_booking_window(branch)
+    if error:
+        return error
+    start_date, end_date = window
+
+    now = datetime.now()
+    ndjson = wants_ndjson()
+    held = scheduling.load_held_cells(worker_ids, start_date, end_date)
+    versions = scheduling.load_day_versions(worker_ids, start_date, end_date)
+    etag = scheduling.availability_etag(worker_ids, service, start_date, end_date, versions, now, 'ndjson' if ndjson else 'json', held)
+    if etag in request.if_none_match:
+        return not_modified(etag)
+
+    if ndjson:
+        def generate():
+            for single_date, slots_by_worker in scheduling.iter_available_days(worker_ids, service, start_date, end_date, versions, now, held):
+                if slots_by_worker:
+                    yield json.dumps({'date': single_date.strftime('%Y-%m-%d'), 'workers': slots_by_worker}) + '\n'
+        return with_etag(Response(stream_with_context(generate()), mimetype='application/x-ndjson'), etag)
+
+    available_slots = scheduling.get_available_slots(worker_ids, service, start_date, end_date, versions, now, held)
 
-    for single_date in (today + timedelta(n) for n in range(8)):
-        work_hours = WorkerWorkHours.query.filter_by(worker_id=worker_id, date=single_date).first()
-        if not work_hours:
-            continue
+    result = []
+    for w in workers:
+        result.append({
+            'id': w.id,
+            'name': w.name,
+            'position_id': w.position_id,
+            'available_slots': available_slots[w.id]
+        })
 
+    return with_etag(jsonify(result), etag)
 
-        day_start = datetime.combine(single_date, time.min)
-        day_end = datetime.combine(single_date, time.max)
-        appointments = Appointment.query.filter(
-            Appointment.worker_id == worker_id,
-            Appointment.service_id == service_id,
-            Appointment.datetime >= day_start,
-            Appointment.datetime <= day_end,
-            Appointment.status != 'Canceled'
-        ).all()
+@client_bp.route('/branches/<int:branch_id>/services/<int:service_id>/earliest_slots', methods=['GET'])
+@query_budget(5)
+def get_earliest_slots(branch_id, service_id):
+    branch = Branch.query.get(branch_id)
+    if not branch:
+        return jsonify({'error': 'Branch not found'}), 404
 
-        booked_slots = set()
-        for appt in appointments:
-            booked_slots.add(appt.datetime.time().strftime('%H:%M'))
+    service = Service.query.get(service_id)
+    if not service:
+        return jsonify({'error': 'Service not found'}), 404
 
+    limit = request.args.get('limit', 5, type=int)
+    if limit < 1 or limit > 50:
+        return jsonify({'error': 'limit must be between 1 and 50'}), 400
 
-        all_slots = get_time_slots(work_hours.start_work_hour, work_hours.end_work_hour, service.duration)
+    position_id = request.args.get('position_id', type=int)
+    workers = {w.id: w for w in queries.qualifying_workers_query(branch_id, service_id, position_id).all()}
 
+    result = []
+    for slot_datetime, worker_id in scheduling.find_earliest_slots(list(workers), service, limit, days=branch.max_booking_days):
+        result.append({
+            'worker_id': worker_id,
+            'worker_name': workers[worker_id].name,
+            'datetime': slot_datetime.isoformat()
+        })
+
+    return jsonify(result)
 
-        free_slots = [slot for slot in all_slots if slot not in booked_slots]
+@client_bp.route('/branches/<int:branch_id>/services_by_position', methods=['GET'])
+@query_budget(2)
+def get_services_grouped_by_position(branch_id):
+    snapshot = catalog.branch_snapshots.get(branch_id)
+    if not snapshot:
+        return jsonify({'error': 'Branch not found'}), 404
 
+    version, body, etag = snapshot
+    if etag in request.if_none_match:
+        return not_modified(etag)
 
-        if single_date == today:
-            free_slots = [slot for slot in free_slots if datetime.strptime(slot, '%H:%M').time() > now_time]
+    return with_etag(Response(body, mimetype='application/json'), etag)
 
-        if free_slots:
-            available_slots[single_date.strftime('%Y-%m-%d')] = free_slots
+@client_bp.route('/holds', methods=['POST', 'OPTIONS'])
+def create_hold():
+    if request.method == 'OPTIONS':
+        return '', 204
 
-    return jsonify(available_slots)
+    data = request.get_json()
+    required_fields = ['worker_id', 'service_id', 'datetime']
+    if not data or not all(field in data for field in required_fields):
+        return jsonify({'error': 'Missing required fields'}), 400
 
-@client_bp.route('/branches/<int:branch_id>/services_by_position', methods=['GET'])
-def get_services_grouped_by_position(branch_id):
-    branch = Branch.query.get(branch_id)
-    if not branch:
-        return jsonify({'error': 'Branch not found'}), 404
+    worker = Worker.query.get(data['worker_id'])
+    if not worker:
+        return jsonify({'error': 'Worker not found'}), 404
 
+    service = Service.query.get(data['service_id'])
+    if not service:
+        return jsonify({'error': 'Service not found'}), 404
 
-    positions = Position.query.filter_by(branch_id=branch_id).all()
-    position_ids = [p.id for p in positions]
+    try:
+        hold_datetime = datetime.fromisoformat(data['datetime'])
+    except ValueError:
+        return jsonify({'error': 'Invalid datetime format'}), 400
 
+    error = check_offered_slot(worker, service, hold_datetime)
+    if error:
+        return error
 
-    service_costs = ServiceCost.query.filter(ServiceCost.position_id.in_(position_ids)).all()
+    if reservations.has_conflict(worker.id, hold_datetime, service.duration):
+        return jsonify({'error': 'Time slot is already booked'}), 409
 
+    try:
+        hold_id, expires_at = holds.create(worker.id, hold_datetime, service.duration, request.remote_addr or '', data.get('replaces'))
+        db.session.commit()
+    except holds.HoldLimit as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 429
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': 'Time slot is held by another customer'}), 409
+
+    return jsonify({'hold_id': hold_id, 'expires_at': expires_at.isoformat(timespec='seconds')}), 201
+
+@client_bp.route('/holds/<hold_id>', methods=['DELETE', 'OPTIONS'])
+def release_hold(hold_id):
+    if request.method == 'OPTIONS':
+        return '', 204
 
-    result = {}
-    for sc in service_costs:
-        if sc.position_id not in result:
-            result[sc.position_id] = []
-        service = Service.query.get(sc.service_id)
-        if service:
-            result[sc.position_id].append({
-                'id': service.id,
-                'name': service.name,
-                'duration': service.duration,
-                'price': sc.price
-            })
-
-
-    response = []
-    for position in positions:
-        response.append({
-            'position_id': position.id,
-            'position_name': position.name,
-            'services': result.get(position.id, [])
-        })
+    if not holds.release(hold_id):
+        return jsonify({'error': 'Hold not found'}), 404
+    db.session.commit()
 
-    return jsonify(response)
+    return jsonify({'message': 'Hold released'})
 
 @client_bp.route('/appointments', methods=['POST', 'OPTIONS'])
+@idempotent
 def create_appointment():
     if request.method == 'OPTIONS':
         return '', 204
@@ -223,6 +358,13 @@ def create_appointment():
     except ValueError:
         return jsonify({'error': 'Invalid datetime format'}), 400
 
+    if reservations.has_conflict(worker.id, appointment_datetime, service.duration):
+        return jsonify({'error': 'Time slot is already booked'}), 409
+
+    hold_id = data.get('hold_id')
+    if holds.blocking_hold(worker.id, appointment_datetime, service.duration, hold_id):
+        return jsonify({'error': 'Time slot is held by another customer'}), 409
+
     new_appointment = Appointment(
         worker_id=worker.id,
         service_id=service.id,
@@ -233,33 +375,26 @@ def create_appointment():
         status='Waiting'
     )
     db.session.add(new_appointment)
-    db.session.commit()
+    try:
+        if hold_id:
+            holds.release(hold_id)
+        reservations.reserve(new_appointment, service.duration)
+        occupancy.refresh_worker_day(new_appointment.worker_id, appointment_datetime.date())
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': 'Time slot is already booked'}), 409
 
     return jsonify({'message': 'Appointment created successfully', 'appointment_id': new_appointment.id})
 
 @client_bp.route('/appointments/<int:appointment_id>', methods=['GET'])
+@query_budget(2)
 def get_appointment(appointment_id):
-    appointment = Appointment.query.get(appointment_id)
-    if not appointment:
+    body = confirmations.get_confirmation(appointment_id)
+    if not body:
         return jsonify({'error': 'Appointment not found'}), 404
 
-    worker = Worker.query.get(appointment.worker_id)
-    service = Service.query.get(appointment.service_id)
-    branch = Branch.query.get(appointment.branch_id)
-    service_cost = ServiceCost.query.filter_by(position_id=worker.position_id, service_id=appointment.service_id).first()
-
-
-    return jsonify({
-        'id': appointment.id,
-        'worker': {'id': worker.id, 'name': worker.name} if worker else None,
-        'service': {'id': service.id, 'name': service.name, 'duration': service.duration } if service else None,
-        'branch': {'id': branch.id, 'name': branch.name, "locality":branch.locality, "address":branch.address} if branch else None,
-        'datetime': appointment.datetime.isoformat(),
-        'customer_name': appointment.customer_name,
-        'customer_phone': appointment.customer_phone,
-        'status': appointment.status,
-        'price' : service_cost.price
-    })
+    return Response(body, mimetype='application/json')
 
 @client_bp.route('/appointments/<int:appointment_id>/cancel', methods=['PATCH', 'OPTIONS'])
 def cancel_appointment(appointment_id):
@@ -271,6 +406,9 @@ def cancel_appointment(appointment_id):
         return jsonify({'error': 'Appointment not found'}), 404
 
     appointment.status = 'Canceled'
+    confirmations.appointment_changed(appointment.id)
+    reservations.release(appointment)
+    occupancy.refresh_worker_day(appointment.worker_id, appointment.datetime.date())
     db.session.commit()
 
     return jsonify({'message': 'Appointment canceled successfully'})
@@ -294,8 +432,27 @@ def reschedule_appointment(appointment_id):
     except ValueError:
         return jsonify({'error': 'Invalid datetime format'}), 400
 
+    service = Service.query.get(appointment.service_id)
+    if service and reservations.has_conflict(appointment.worker_id, new_datetime, service.duration, appointment.id):
+        return jsonify({'error': 'Time slot is already booked'}), 409
+    if service and holds.blocking_hold(appointment.worker_id, new_datetime, service.duration):
+        return jsonify({'error': 'Time slot is held by another customer'}), 409
+
+    old_date = appointment.datetime.date()
     appointment.datetime = new_datetime
     appointment.status = 'Waiting'
-    db.session.commit()
+    confirmations.appointment_changed(appointment.id)
+    try:
+        reservations.release(appointment)
+        if service:
+            reservations.reserve(appointment, service.duration)
+        occupancy.refresh_worker_days([
+            (appointment.worker_id, old_date),
+            (appointment.worker_id, new_datetime.date())
+        ])
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': 'Time slot is already booked'}), 409
 
     return jsonify({'message': 'Appointment rescheduled successfully'})
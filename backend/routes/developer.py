@@ -1,26 +1,23 @@
+import os
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from functools import wraps
-from models import db, Admin
-from werkzeug.security import generate_password_hash
+import principal
+from instrumentation import slow_query_log
+from models import db, Admin, Principal
+from passwords import hash_password, password_pool
 from sqlalchemy.exc import IntegrityError
 
 developer_bp = Blueprint('developer', __name__)
 
 def get_current_admin():
-    try:
-        admin_id = get_jwt_identity()
-        return Admin.query.get(admin_id)
-    except Exception as e:
-        print(f"JWT identity error: {e}")
-        return None
+    return principal.current_admin()
 
 def developer_required(f):
     @wraps(f)
     @jwt_required()
     def decorated(*args, **kwargs):
-        admin = get_current_admin()
-        if admin.role != 'developer':
+        if principal.current_role() != 'developer':
             return jsonify({'error': 'Developer access required'}), 403
         return f(*args, **kwargs)
     return decorated
@@ -36,10 +33,10 @@ def register_owner():
     if not email or not password:
         return jsonify({'error': 'Email and password are required'}), 400
 
-    if Admin.query.filter_by(email=email).first():
+    if Principal.query.filter_by(email=email).first():
         return jsonify({'error': 'Email already registered'}), 409
 
-    hashed_password = generate_password_hash(password)
+    hashed_password = hash_password(password)
     new_admin = Admin(email=email, password=hashed_password, role='owner', name=name)
 
     try:
@@ -52,3 +49,31 @@ def register_owner():
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': f'Unexpected error: {str(e)}'}), 500
+
+
+@developer_bp.route('/metrics/password-pool', methods=['GET'])
+@developer_required
+def password_pool_metrics():
+    return jsonify(password_pool.stats())
+
+
+@developer_bp.route('/slow-queries', methods=['GET'])
+@developer_required
+def get_slow_queries():
+    entries = slow_query_log.snapshot()
+    limit = request.args.get('limit', type=int)
+    if limit:
+        entries = entries[:limit]
+    # Each worker process keeps its own buffer; the log file has them all.
+    return jsonify({
+        'threshold_ms': slow_query_log.threshold_ms,
+        'pid': os.getpid(),
+        'entries': entries
+    })
+
+
+@developer_bp.route('/slow-queries', methods=['DELETE'])
+@developer_required
+def clear_slow_queries():
+    slow_query_log.clear()
+    return jsonify({'message': 'Slow query log cleared'})
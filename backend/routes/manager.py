@@ -1,31 +1,40 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from functools import wraps
+import principal
+from instrumentation import query_budget
 from models import db, Admin, Branch, Position, Service, ServiceCost, Worker, WorkerWorkHours, Appointment
 from datetime import time, datetime, timedelta
-from werkzeug.security import generate_password_hash
+from passwords import hash_password
+import occupancy
+import holds
+import scheduling
+import reservations
+import importer
+import confirmations
+from tokens import revocation_list
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
 
 manager_bp = Blueprint('manager', __name__)
 
 def get_current_admin():
-    try:
-        admin_id = get_jwt_identity()
-        return Admin.query.get(admin_id)
-    except Exception as e:
-        print(f"JWT identity error: {e}")
-        return None
+    return principal.current_admin()
 
 def manager_required(f):
     @wraps(f)
     @jwt_required()
     def decorated(*args, **kwargs):
-        admin = get_current_admin()
-        if admin.role != 'manager':
+        if principal.current_role() != 'manager':
             return jsonify({'error': 'Manager access required'}), 403
         return f(*args, **kwargs)
     return decorated
 
 def check_branch_access(branch_id):
+    if principal.claim('branch_id') == branch_id:
+        return None
+    # The manager may have been moved to another branch since login.
     admin = get_current_admin()
 
     branch = Branch.query.filter(Branch.id == branch_id, Branch.managers.any(id=admin.id)).first()
@@ -54,7 +63,7 @@ def manage_workers():
         branches = Branch.query.filter(Branch.managers.any(id=admin.id)).all()
         branch_ids = [b.id for b in branches]
 
-        workers = Worker.query.filter(Worker.branch_id.in_(branch_ids)).all()
+        workers = Worker.query.options(joinedload(Worker.position)).filter(Worker.branch_id.in_(branch_ids)).all()
 
         return jsonify([{
             'id': w.id,
@@ -73,7 +82,7 @@ def manage_workers():
             position_id = data['position_id']
             email = data['email']
             password = data['password']
-            hashed_password = generate_password_hash(password)
+            hashed_password = hash_password(password)
             branch_id = admin.branch_id
 
             branch = Branch.query.filter(Branch.id == branch_id, Branch.managers.any(id=admin.id)).first()
@@ -116,7 +125,10 @@ def modify_worker(worker_id):
             db.session.rollback()
             return jsonify({'error': str(e)}), 400
     elif request.method == 'DELETE':
+        occupancy.delete_worker_days(worker.id)
+        holds.release_worker(worker.id)
         db.session.delete(worker)
+        revocation_list.revoke_subject('worker', worker.id)
         db.session.commit()
         return jsonify({'message': 'Worker deleted'})
 
@@ -154,6 +166,7 @@ def manage_work_hours(worker_id):
             )
 
             db.session.add(new_wh)
+            occupancy.refresh_worker_day(worker_id, date)
             db.session.commit()
 
             return jsonify({
@@ -195,6 +208,7 @@ def modify_work_hour(work_hour_id):
             if wh.start_work_hour >= wh.end_work_hour:
                 return jsonify({'error': 'Invalid time range'}), 400
 
+            occupancy.refresh_worker_day(wh.worker_id, wh.date)
             db.session.commit()
             return jsonify({'message': 'Work hours updated'})
 
@@ -203,6 +217,7 @@ def modify_work_hour(work_hour_id):
 
     elif request.method == 'DELETE':
         db.session.delete(wh)
+        occupancy.refresh_worker_day(wh.worker_id, wh.date)
         db.session.commit()
         return jsonify({'message': 'Work hours deleted'})
 
@@ -219,23 +234,31 @@ def add_batch_work_hours(worker_id):
         start_date = datetime.strptime(data['start_date'], '%Y-%m-%d').date()
         end_date = datetime.strptime(data['end_date'], '%Y-%m-%d').date()
         days_of_week = data.get('days_of_week', [0,1,2,3,4,5,6])
+        start_work_hour = datetime.strptime(data['start_time'], '%H:%M').time()
+        end_work_hour = datetime.strptime(data['end_time'], '%H:%M').time()
+
+        # One lookup for the whole range instead of one per day.
+        existing_dates = {
+            day for (day,) in db.session.query(WorkerWorkHours.date).filter(
+                WorkerWorkHours.worker_id == worker_id,
+                WorkerWorkHours.date >= start_date,
+                WorkerWorkHours.date <= end_date
+            )
+        }
 
+        added_days = []
         current_date = start_date
         while current_date <= end_date:
-            if current_date.weekday() in days_of_week:
-                if not WorkerWorkHours.query.filter_by(
-                    worker_id=worker_id,
-                    date=current_date
-                ).first():
-                    new_wh = WorkerWorkHours(
-                        worker_id=worker_id,
-                        date=current_date,
-                        start_work_hour=datetime.strptime(data['start_time'], '%H:%M').time(),
-                        end_work_hour=datetime.strptime(data['end_time'], '%H:%M').time()
-                    )
-                    db.session.add(new_wh)
+            if current_date.weekday() in days_of_week and current_date not in existing_dates:
+                added_days.append((worker_id, current_date))
             current_date += timedelta(days=1)
 
+        if added_days:
+            db.session.execute(insert(WorkerWorkHours), [
+                {'worker_id': worker_id, 'date': day, 'start_work_hour': start_work_hour, 'end_work_hour': end_work_hour}
+                for _, day in added_days
+            ])
+        occupancy.refresh_worker_days(added_days)
         db.session.commit()
         return jsonify({'message': 'Batch hours added'}), 201
 
@@ -246,6 +269,7 @@ def add_batch_work_hours(worker_id):
 
 @manager_bp.route('/appointments', methods=['GET'])
 @manager_required
+@query_budget(3)
 def get_appointments():
     admin = get_current_admin()
     if not admin:
@@ -278,6 +302,17 @@ def get_appointments():
     return jsonify(result)
 
 
+@manager_bp.route('/appointments/import', methods=['POST'])
+@manager_required
+def import_appointments():
+    admin = get_current_admin()
+    if not admin.branch_id:
+        return jsonify({'error': 'Manager is not assigned to a branch'}), 403
+
+    report = importer.import_appointments(admin.branch_id, request.stream, request.mimetype)
+    return jsonify(report), 200 if report['imported'] or not report['failed'] else 400
+
+
 @manager_bp.route('/appointments/<int:appointment_id>/status', methods=['PUT'])
 @manager_required
 def update_appointment_status(appointment_id):
@@ -298,10 +333,26 @@ def update_appointment_status(appointment_id):
     if new_status not in valid_statuses:
         return jsonify({'error': 'Invalid status value'}), 400
 
+    service = None
+    if appointment.status == 'Canceled' and new_status != 'Canceled':
+        service = Service.query.get(appointment.service_id)
+        if service and reservations.has_conflict(appointment.worker_id, appointment.datetime, service.duration, appointment.id):
+            return jsonify({'error': 'Time slot is already booked'}), 409
+
+    old_status = appointment.status
     appointment.status = new_status
+    confirmations.appointment_changed(appointment.id)
     try:
+        if new_status == 'Canceled' and old_status != 'Canceled':
+            reservations.release(appointment)
+        elif service:
+            reservations.reserve(appointment, service.duration)
+        occupancy.refresh_worker_day(appointment.worker_id, appointment.datetime.date())
         db.session.commit()
         return jsonify({'message': 'Appointment status updated'})
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': 'Time slot is already booked'}), 409
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
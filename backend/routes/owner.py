@@ -1,45 +1,56 @@
 from flask import Blueprint, request, jsonify, render_template
 from flask_jwt_extended import jwt_required, get_jwt_identity, create_access_token
 from functools import wraps
-from models import db, Business, Admin, Branch, Position, Service, ServiceCost, Worker, WorkerWorkHours
+import principal
+from instrumentation import query_budget
+from models import db, Business, Admin, Principal, Branch, Position, Service, ServiceCost, Worker, WorkerWorkHours
 from datetime import time, datetime, timedelta
 from sqlalchemy.exc import IntegrityError
-from werkzeug.security import generate_password_hash, check_password_hash
+from passwords import hash_password
 from flask_jwt_extended import verify_jwt_in_request
+import occupancy
+import scheduling
+import reservations
+import importer
+import catalog
+import acl
+from tokens import revocation_list
 
 owner_bp = Blueprint('owner', __name__)
 
 def get_current_admin():
-    try:
-        admin_id = get_jwt_identity()
-        return Admin.query.get(admin_id)
-    except Exception as e:
-        print(f"JWT identity error: {e}")
-        return None
+    return principal.current_admin()
 
 def owner_required(f):
     @wraps(f)
     @jwt_required()
     def decorated(*args, **kwargs):
-        admin = get_current_admin()
-        if admin.role != 'owner':
+        if principal.current_role() != 'owner':
             return jsonify({'error': 'Owner access required'}), 403
         return f(*args, **kwargs)
     return decorated
 
-def check_branch_access(branch_id):
-    admin = get_current_admin()
-
-    branch = Branch.query.get(branch_id)
-    if not branch:
-        return jsonify({'error': 'Branch not found'}), 404
-    if not branch.business_id:
-        return jsonify({'error': 'Branch business not set'}), 400
-    business = Business.query.filter(Business.id == branch.business_id, Business.owners.any(id=admin.id)).first()
-    if not business:
-        return jsonify({'error': 'Access denied to this branch'}), 403
+ACCESS_MODELS = {'business': Business, 'branch': Branch, 'position': Position, 'service': Service}
+
+def get_current_acl(kind=None, object_id=None):
+    owner_id = int(get_jwt_identity())
+    if kind is None or object_id is None:
+        return acl.get_owner_acl(owner_id)
+    return acl.get_owner_acl_allowing(owner_id, kind, object_id)
+
+def check_access(kind, object_id):
+    # Also loads the object, so the route's own get() is an identity-map hit;
+    # a cached ACL can still allow an object another worker just deleted.
+    allowed = get_current_acl(kind, object_id).allows(kind, object_id)
+    if not db.session.get(ACCESS_MODELS[kind], object_id):
+        return jsonify({'error': f'{kind.capitalize()} not found'}), 404
+    if not allowed:
+        return jsonify({'error': f'Access denied to this {kind}'}), 403
     return None
 
+def check_branch_access(branch_id):
+    return check_access('branch', branch_id)
+
 
 @owner_bp.route('/register', methods=['POST'])
 @owner_required
@@ -61,10 +72,10 @@ def register_manager():
     except Exception as e:
         return jsonify({'error': f'Invalid token: {str(e)}'}), 401
 
-    if Admin.query.filter_by(email=email).first():
+    if Principal.query.filter_by(email=email).first():
         return jsonify({'error': 'Email already registered'}), 409
 
-    hashed_password = generate_password_hash(password)
+    hashed_password = hash_password(password)
     new_admin = Admin(email=email, password=hashed_password, role=role, name=name)
 
     try:
@@ -93,6 +104,7 @@ def create_business():
         db.session.commit()
 
         new_business.owners.append(admin)
+        acl.structure_changed()
         db.session.commit()
         return jsonify({'message': 'Business created', 'id': new_business.id}), 201
     except Exception as e:
@@ -112,14 +124,17 @@ def get_businesses():
 @owner_bp.route('/businesses/<int:business_id>', methods=['PUT'])
 @owner_required
 def update_business(business_id):
-    admin = get_current_admin()
-    business = Business.query.filter(Business.id == business_id, Business.owners.any(id=admin.id)).first_or_404()
+    error = check_access('business', business_id)
+    if error:
+        return error
+    business = Business.query.get(business_id)
 
     data = request.get_json()
     if 'name' in data:
         if Business.query.filter(Business.name == data['name'], Business.id != business_id).first():
             return jsonify({'error': 'Business name already exists'}), 400
         business.name = data['name']
+        catalog.business_changed(business_id)
 
     db.session.commit()
     return jsonify({'message': 'Business updated'})
@@ -127,14 +142,18 @@ def update_business(business_id):
 @owner_bp.route('/businesses/<int:business_id>', methods=['DELETE'])
 @owner_required
 def delete_business(business_id):
-    admin = get_current_admin()
-    business = Business.query.filter(Business.id == business_id, Business.owners.any(id=admin.id)).first_or_404()
+    error = check_access('business', business_id)
+    if error:
+        return error
+    business = Business.query.get(business_id)
 
 
     if len(business.branches) > 0:
         return jsonify({'error': 'Delete branches first'}), 400
 
     db.session.delete(business)
+    catalog.business_changed(business_id)
+    acl.structure_changed()
     db.session.commit()
     return jsonify({'message': 'Business deleted'})
 
@@ -142,11 +161,9 @@ def delete_business(business_id):
 @owner_bp.route('/businesses/<int:business_id>/branches', methods=['POST'])
 @owner_required
 def create_branch(business_id):
-    admin = get_current_admin()
-
-    business = Business.query.filter(Business.id == business_id, Business.owners.any(id=admin.id)).first()
-    if not business:
-        return jsonify({'error': 'Access denied'}), 403
+    error = check_access('business', business_id)
+    if error:
+        return error
 
     data = request.get_json()
     try:
@@ -157,9 +174,14 @@ def create_branch(business_id):
             address=data['address'],
             phone_number=data['phone_number'],
             start_work_hour=time.fromisoformat(data['start_work_hour']),
-            end_work_hour=time.fromisoformat(data['end_work_hour'])
+            end_work_hour=time.fromisoformat(data['end_work_hour']),
+            max_booking_days=int(data.get('max_booking_days', 8))
         )
+        if not 1 <= new_branch.max_booking_days <= scheduling.MAX_BOOKING_DAYS:
+            return jsonify({'error': 'Invalid booking horizon'}), 400
         db.session.add(new_branch)
+        catalog.business_changed(business_id)
+        acl.structure_changed()
         db.session.commit()
 
         manager_ids = data.get('manager_ids', [])
@@ -176,7 +198,9 @@ def create_branch(business_id):
 @owner_bp.route('/businesses/<int:business_id>/branches', methods=['GET'])
 @owner_required
 def get_branches(business_id):
-    admin = get_current_admin()
+    error = check_access('business', business_id)
+    if error:
+        return error
     branches = Branch.query.filter_by(business_id=business_id).all()
     return jsonify([{
         'id': b.id,
@@ -185,7 +209,8 @@ def get_branches(business_id):
         'address': b.address,
         'phone_number': b.phone_number,
         'start_work_hour': b.start_work_hour.isoformat(),
-        'end_work_hour': b.end_work_hour.isoformat()
+        'end_work_hour': b.end_work_hour.isoformat(),
+        'max_booking_days': b.max_booking_days
     } for b in branches])
 
 @owner_bp.route('/branches/<int:branch_id>', methods=['PUT'])
@@ -205,6 +230,15 @@ def update_branch(branch_id):
             return jsonify({'error': 'Invalid work hours'}), 400
 
 
+    if 'max_booking_days' in data:
+        try:
+            max_booking_days = int(data['max_booking_days'])
+        except (TypeError, ValueError):
+            return jsonify({'error': 'Invalid booking horizon'}), 400
+        if not 1 <= max_booking_days <= scheduling.MAX_BOOKING_DAYS:
+            return jsonify({'error': 'Invalid booking horizon'}), 400
+        branch.max_booking_days = max_booking_days
+
     for field in ['name', 'locality', 'address', 'phone_number']:
         if field in data:
             setattr(branch, field, data[field])
@@ -214,6 +248,7 @@ def update_branch(branch_id):
     if 'end_work_hour' in data:
         branch.end_work_hour = time.fromisoformat(data['end_work_hour'])
 
+    catalog.business_changed(branch.business_id)
     db.session.commit()
     return jsonify({'message': 'Branch updated'})
 
@@ -230,6 +265,9 @@ def delete_branch(branch_id):
         return jsonify({'error': 'Delete workers first'}), 400
 
     db.session.delete(branch)
+    catalog.branch_changed(branch_id)
+    catalog.business_changed(branch.business_id)
+    acl.structure_changed()
     db.session.commit()
     return jsonify({'message': 'Branch deleted'})
 
@@ -259,13 +297,10 @@ def assign_manager_to_branch(branch_id, manager_id):
     if not admin:
         return jsonify({'error': 'Invalid admin'}), 401
 
-    branch = Branch.query.get_or_404(branch_id)
-    if not branch.business_id:
-        return jsonify({'error': 'Branch business not set'}), 400
-
-    business = Business.query.filter(Business.id == branch.business_id, Business.owners.any(id=admin.id)).first()
-    if not business:
-        return jsonify({'error': 'Access denied to this branch'}), 403
+    error = check_access('branch', branch_id)
+    if error:
+        return error
+    branch = Branch.query.get(branch_id)
 
     manager = Admin.query.filter_by(id=manager_id, role='manager').first()
     if not manager:
@@ -273,6 +308,7 @@ def assign_manager_to_branch(branch_id, manager_id):
 
 
     manager.branch = branch
+    revocation_list.revoke_subject('admin', manager.id)
     db.session.commit()
     return jsonify({'message': 'Manager assigned to branch'}), 200
 
@@ -289,15 +325,11 @@ def delete_manager(manager_id):
         return jsonify({'error': 'Manager not found'}), 404
 
 
-    if manager.branch:
-        branch = Branch.query.get(manager.branch_id)
-        if not branch or not branch.business_id:
-            return jsonify({'error': 'Branch business not set'}), 400
-        business = Business.query.filter(Business.id == branch.business_id, Business.owners.any(id=admin.id)).first()
-        if not business:
-            return jsonify({'error': 'Access denied to this manager'}), 403
+    if manager.branch_id and not get_current_acl('branch', manager.branch_id).allows('branch', manager.branch_id):
+        return jsonify({'error': 'Access denied to this manager'}), 403
 
     db.session.delete(manager)
+    revocation_list.revoke_subject('admin', manager.id)
     db.session.commit()
     return jsonify({'message': 'Manager deleted'}), 200
 
@@ -324,14 +356,10 @@ from models import Position, Service, ServiceCost
 @owner_bp.route('/branches/<int:branch_id>/positions', methods=['GET'])
 @owner_required
 def get_positions(branch_id):
-    admin = get_current_admin()
 
-    branch = Branch.query.get_or_404(branch_id)
-    if not branch.business_id:
-        return jsonify({'error': 'Branch business not set'}), 400
-    business = Business.query.filter(Business.id == branch.business_id, Business.owners.any(id=admin.id)).first()
-    if not business:
-        return jsonify({'error': 'Access denied to this branch'}), 403
+    error = check_access('branch', branch_id)
+    if error:
+        return error
 
     positions = Position.query.filter_by(branch_id=branch_id).all()
     return jsonify([{'id': p.id, 'name': p.name} for p in positions])
@@ -339,41 +367,38 @@ def get_positions(branch_id):
 @owner_bp.route('/branches/<int:branch_id>/positions', methods=['POST'])
 @owner_required
 def create_position(branch_id):
-    admin = get_current_admin()
     data = request.get_json()
     name = data.get('name')
     if not name:
         return jsonify({'error': 'Position name is required'}), 400
 
-    branch = Branch.query.get_or_404(branch_id)
-    if not branch.business_id:
-        return jsonify({'error': 'Branch business not set'}), 400
-    business = Business.query.filter(Business.id == branch.business_id, Business.owners.any(id=admin.id)).first()
-    if not business:
-        return jsonify({'error': 'Access denied to this branch'}), 403
+    error = check_access('branch', branch_id)
+    if error:
+        return error
 
     new_position = Position(name=name, branch_id=branch_id)
     db.session.add(new_position)
+    db.session.flush()
+    catalog.position_changed(new_position.id, branch_id)
+    acl.structure_changed()
     db.session.commit()
     return jsonify({'message': 'Position created', 'id': new_position.id}), 201
 
 @owner_bp.route('/positions/<int:position_id>', methods=['PUT'])
 @owner_required
 def update_position(position_id):
-    admin = get_current_admin()
-    position = Position.query.get_or_404(position_id)
-    branch = Branch.query.get(position.branch_id)
-    if not branch or not branch.business_id:
-        return jsonify({'error': 'Branch business not set'}), 400
-    business = Business.query.filter(Business.id == branch.business_id, Business.owners.any(id=admin.id)).first()
-    if not business:
-        return jsonify({'error': 'Access denied to this position'}), 403
+    error = check_access('position', position_id)
+    if error:
+        return error
+    position = Position.query.get(position_id)
 
     data = request.get_json()
     name = data.get('name')
     if name:
-        position.name = name
-        db.session.commit()
+        if name != position.name:
+            position.name = name
+            catalog.position_changed(position.id, position.branch_id)
+            db.session.commit()
         return jsonify({'message': 'Position updated'})
     else:
         return jsonify({'error': 'Position name is required'}), 400
@@ -381,15 +406,13 @@ def update_position(position_id):
 @owner_bp.route('/positions/<int:position_id>', methods=['DELETE'])
 @owner_required
 def delete_position(position_id):
-    admin = get_current_admin()
-    position = Position.query.get_or_404(position_id)
-    branch = Branch.query.get(position.branch_id)
-    if not branch or not branch.business_id:
-        return jsonify({'error': 'Branch business not set'}), 400
-    business = Business.query.filter(Business.id == branch.business_id, Business.owners.any(id=admin.id)).first()
-    if not business:
-        return jsonify({'error': 'Access denied to this position'}), 403
+    error = check_access('position', position_id)
+    if error:
+        return error
+    position = Position.query.get(position_id)
 
+    catalog.position_changed(position.id, position.branch_id)
+    acl.structure_changed()
     db.session.delete(position)
     db.session.commit()
     return jsonify({'message': 'Position deleted'})
@@ -398,13 +421,9 @@ def delete_position(position_id):
 @owner_bp.route('/branches/<int:branch_id>/services', methods=['GET'])
 @owner_required
 def get_services(branch_id):
-    admin = get_current_admin()
-    branch = Branch.query.get_or_404(branch_id)
-    if not branch.business_id:
-        return jsonify({'error': 'Branch business not set'}), 400
-    business = Business.query.filter(Business.id == branch.business_id, Business.owners.any(id=admin.id)).first()
-    if not business:
-        return jsonify({'error': 'Access denied to this branch'}), 403
+    error = check_access('branch', branch_id)
+    if error:
+        return error
 
     services = Service.query.filter_by(branch_id=branch_id).all()
     return jsonify([{'id': s.id, 'name': s.name, 'duration': s.duration} for s in services])
@@ -412,60 +431,67 @@ def get_services(branch_id):
 @owner_bp.route('/branches/<int:branch_id>/services', methods=['POST'])
 @owner_required
 def create_service(branch_id):
-    admin = get_current_admin()
     data = request.get_json()
     name = data.get('name')
     duration = data.get('duration')
     if not name or duration is None:
         return jsonify({'error': 'Service name and duration are required'}), 400
 
-    branch = Branch.query.get_or_404(branch_id)
-    if not branch.business_id:
-        return jsonify({'error': 'Branch business not set'}), 400
-    business = Business.query.filter(Business.id == branch.business_id, Business.owners.any(id=admin.id)).first()
-    if not business:
-        return jsonify({'error': 'Access denied to this branch'}), 403
+    error = check_access('branch', branch_id)
+    if error:
+        return error
 
     new_service = Service(name=name, duration=duration, branch_id=branch_id)
     db.session.add(new_service)
+    acl.structure_changed()
     db.session.commit()
     return jsonify({'message': 'Service created', 'id': new_service.id}), 201
 
 @owner_bp.route('/services/<int:service_id>', methods=['PUT'])
 @owner_required
 def update_service(service_id):
-    admin = get_current_admin()
-    service = Service.query.get_or_404(service_id)
-    branch = Branch.query.get(service.branch_id)
-    if not branch or not branch.business_id:
-        return jsonify({'error': 'Branch business not set'}), 400
-    business = Business.query.filter(Business.id == branch.business_id, Business.owners.any(id=admin.id)).first()
-    if not business:
-        return jsonify({'error': 'Access denied to this service'}), 403
+    error = check_access('service', service_id)
+    if error:
+        return error
+    service = Service.query.get(service_id)
 
     data = request.get_json()
     name = data.get('name')
     duration = data.get('duration')
-    if name:
+    name_changed = bool(name) and name != service.name
+    duration_changed = duration is not None and duration != service.duration
+    # A no-op PUT must not bump the branch catalog_version and throw away
+    # every cached menu and snapshot ETag.
+    if not name_changed and not duration_changed:
+        return jsonify({'message': 'Service updated'})
+
+    catalog.service_changed(service)
+    if name_changed:
         service.name = name
-    if duration is not None:
+    if duration_changed:
         service.duration = duration
+        try:
+            reservations.rereserve_service(service)
+        except IntegrityError:
+            db.session.rollback()
+            return jsonify({'error': 'New duration overlaps existing appointments'}), 409
+        occupancy.refresh_service_days(service.id)
     db.session.commit()
     return jsonify({'message': 'Service updated'})
 
 @owner_bp.route('/services/<int:service_id>', methods=['DELETE'])
 @owner_required
 def delete_service(service_id):
-    admin = get_current_admin()
-    service = Service.query.get_or_404(service_id)
-    branch = Branch.query.get(service.branch_id)
-    if not branch or not branch.business_id:
-        return jsonify({'error': 'Branch business not set'}), 400
-    business = Business.query.filter(Business.id == branch.business_id, Business.owners.any(id=admin.id)).first()
-    if not business:
-        return jsonify({'error': 'Access denied to this service'}), 403
+    error = check_access('service', service_id)
+    if error:
+        return error
+    service = Service.query.get(service_id)
 
+    catalog.service_changed(service)
+    acl.structure_changed()
     db.session.delete(service)
+    reservations.release_service(service.id)
+    occupancy.refresh_service_days(service.id)
     db.session.commit()
     return jsonify({'message': 'Service deleted'})
 
@@ -473,13 +499,9 @@ def delete_service(service_id):
 @owner_bp.route('/branches/<int:branch_id>/service_costs', methods=['GET'])
 @owner_required
 def get_service_costs_by_branch(branch_id):
-    admin = get_current_admin()
-    branch = Branch.query.get_or_404(branch_id)
-    if not branch.business_id:
-        return jsonify({'error': 'Branch business not set'}), 400
-    business = Business.query.filter(Business.id == branch.business_id, Business.owners.any(id=admin.id)).first()
-    if not business:
-        return jsonify({'error': 'Access denied to this branch'}), 403
+    error = check_access('branch', branch_id)
+    if error:
+        return error
 
     positions = Position.query.filter_by(branch_id=branch_id).all()
     position_ids = [p.id for p in positions]
@@ -511,44 +533,44 @@ def get_service_costs_by_branch(branch_id):
 @owner_bp.route('/positions/<int:position_id>/service_costs', methods=['POST'])
 @owner_required
 def create_service_cost(position_id):
-    admin = get_current_admin()
     data = request.get_json()
     service_id = data.get('service_id')
     price = data.get('price')
     if not service_id or price is None:
         return jsonify({'error': 'Service ID and price are required'}), 400
+    # The frontend sends the id from a <select>, so it arrives as a string;
+    # the ACL is keyed by int.
+    try:
+        service_id = int(service_id)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Service ID must be an integer'}), 400
 
-    position = Position.query.get_or_404(position_id)
-    branch = Branch.query.get(position.branch_id)
-    if not branch or not branch.business_id:
-        return jsonify({'error': 'Branch business not set'}), 400
-    business = Business.query.filter(Business.id == branch.business_id, Business.owners.any(id=admin.id)).first()
-    if not business:
-        return jsonify({'error': 'Access denied to this position'}), 403
+    error = check_access('position', position_id) or check_access('service', service_id)
+    if error:
+        return error
 
     new_service_cost = ServiceCost(position_id=position_id, service_id=service_id, price=price)
     db.session.add(new_service_cost)
+    catalog.position_changed(position_id, get_current_acl().positions[position_id])
     db.session.commit()
     return jsonify({'message': 'Service cost created', 'id': new_service_cost.id}), 201
 
 @owner_bp.route('/service_costs/<int:service_cost_id>', methods=['PUT'])
 @owner_required
 def update_service_cost(service_cost_id):
-    admin = get_current_admin()
     service_cost = ServiceCost.query.get_or_404(service_cost_id)
-    position = Position.query.get(service_cost.position_id)
-    branch = Branch.query.get(position.branch_id)
-    if not branch or not branch.business_id:
-        return jsonify({'error': 'Branch business not set'}), 400
-    business = Business.query.filter(Business.id == branch.business_id, Business.owners.any(id=admin.id)).first()
-    if not business:
+    owner_acl = get_current_acl('position', service_cost.position_id)
+    if not owner_acl.allows('position', service_cost.position_id):
         return jsonify({'error': 'Access denied to this service cost'}), 403
+    branch_id = owner_acl.positions[service_cost.position_id]
 
     data = request.get_json()
     price = data.get('price')
     if price is not None:
-        service_cost.price = price
-        db.session.commit()
+        if price != service_cost.price:
+            service_cost.price = price
+            catalog.position_changed(service_cost.position_id, branch_id)
+            db.session.commit()
         return jsonify({'message': 'Service cost updated'})
     else:
         return jsonify({'error': 'Price is required'}), 400
@@ -556,20 +578,27 @@ def update_service_cost(service_cost_id):
 @owner_bp.route('/service_costs/<int:service_cost_id>', methods=['DELETE'])
 @owner_required
 def delete_service_cost(service_cost_id):
-    admin = get_current_admin()
     service_cost = ServiceCost.query.get_or_404(service_cost_id)
-    position = Position.query.get(service_cost.position_id)
-    branch = Branch.query.get(position.branch_id)
-    if not branch or not branch.business_id:
-        return jsonify({'error': 'Branch business not set'}), 400
-    business = Business.query.filter(Business.id == branch.business_id, Business.owners.any(id=admin.id)).first()
-    if not business:
+    owner_acl = get_current_acl('position', service_cost.position_id)
+    if not owner_acl.allows('position', service_cost.position_id):
         return jsonify({'error': 'Access denied to this service cost'}), 403
+    branch_id = owner_acl.positions[service_cost.position_id]
 
+    catalog.position_changed(service_cost.position_id, branch_id)
     db.session.delete(service_cost)
     db.session.commit()
     return jsonify({'message': 'Service cost deleted'})
 
+@owner_bp.route('/branches/<int:branch_id>/appointments/import', methods=['POST'])
+@owner_required
+def import_appointments(branch_id):
+    error = check_branch_access(branch_id)
+    if error:
+        return error
+
+    report = importer.import_appointments(branch_id, request.stream, request.mimetype)
+    return jsonify(report), 200 if report['imported'] or not report['failed'] else 400
+
 # -------------------- Reports Endpoints --------------------
 
 from sqlalchemy import func
@@ -577,11 +606,8 @@ from models import Appointment, Service
 
 @owner_bp.route('/reports/revenue', methods=['GET'])
 @owner_required
+@query_budget(6)
 def get_revenue_report():
-    admin = get_current_admin()
-    if not admin:
-        return jsonify({'error': 'Unauthorized'}), 401
-
     start_date_str = request.args.get('start_date')
     end_date_str = request.args.get('end_date')
     business_id = request.args.get('business_id', type=int)
@@ -593,8 +619,7 @@ def get_revenue_report():
     except ValueError:
         return jsonify({'error': 'Invalid date format'}), 400
 
-    businesses = Business.query.filter(Business.owners.any(id=admin.id)).all()
-    business_ids = [b.id for b in businesses]
+    business_ids = list(get_current_acl('business', business_id).business_ids)
 
     if business_id and business_id not in business_ids:
         return jsonify({'error': 'Access denied to this business'}), 403
@@ -618,11 +643,8 @@ def get_revenue_report():
 
 @owner_bp.route('/reports/clients', methods=['GET'])
 @owner_required
+@query_budget(6)
 def get_clients_report():
-    admin = get_current_admin()
-    if not admin:
-        return jsonify({'error': 'Unauthorized'}), 401
-
     start_date_str = request.args.get('start_date')
     end_date_str = request.args.get('end_date')
     business_id = request.args.get('business_id', type=int)
@@ -634,8 +656,7 @@ def get_clients_report():
     except ValueError:
         return jsonify({'error': 'Invalid date format'}), 400
 
-    businesses = Business.query.filter(Business.owners.any(id=admin.id)).all()
-    business_ids = [b.id for b in businesses]
+    business_ids = list(get_current_acl('business', business_id).business_ids)
 
     if business_id and business_id not in business_ids:
         return jsonify({'error': 'Access denied to this business'}), 403
@@ -661,11 +682,8 @@ def get_clients_report():
 
 @owner_bp.route('/reports/services', methods=['GET'])
 @owner_required
+@query_budget(6)
 def get_services_report():
-    admin = get_current_admin()
-    if not admin:
-        return jsonify({'error': 'Unauthorized'}), 401
-
     start_date_str = request.args.get('start_date')
     end_date_str = request.args.get('end_date')
     business_id = request.args.get('business_id', type=int)
@@ -677,8 +695,7 @@ def get_services_report():
     except ValueError:
         return jsonify({'error': 'Invalid date format'}), 400
 
-    businesses = Business.query.filter(Business.owners.any(id=admin.id)).all()
-    business_ids = [b.id for b in businesses]
+    business_ids = list(get_current_acl('business', business_id).business_ids)
 
     if business_id and business_id not in business_ids:
         return jsonify({'error': 'Access denied to this business'}), 403
@@ -1,40 +1,39 @@
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from functools import wraps
-from models import db, Admin, Appointment, Worker, WorkerWorkHours
+import principal
+from instrumentation import query_budget
+from models import db, Admin, Appointment, Service, Worker, WorkerWorkHours
 from datetime import datetime, date
 
 worker_bp = Blueprint('worker', __name__)
 
 def get_current_worker():
-    try:
-        worker_id = get_jwt_identity()
-        return Worker.query.get(worker_id)
-    except Exception as e:
-        print(f"JWT identity error: {e}")
-        return None
+    return principal.current_worker()
 
 def worker_required(f):
     @wraps(f)
     @jwt_required()
     def decorated(*args, **kwargs):
-        worker = get_current_worker()
-        if not worker:
+        if principal.current_role() != 'worker' or not get_current_worker():
             return jsonify({'error': 'Worker access required'}), 403
         return f(*args, **kwargs)
     return decorated
 
 @worker_bp.route('/appointments', methods=['GET'])
 @worker_required
+@query_budget(3)
 def get_worker_appointments():
     worker = get_current_worker()
     if not worker:
         return jsonify({'error': 'Unauthorized'}), 401
 
-    appointments = Appointment.query.filter_by(worker_id=worker.id).all()
+    appointments = db.session.query(Appointment, Service.name).outerjoin(
+        Service, Appointment.service_id == Service.id
+    ).filter(Appointment.worker_id == worker.id).all()
 
     result = []
-    for appt in appointments:
+    for appt, service_name in appointments:
         result.append({
             'id': appt.id,
             'status': appt.status,
@@ -42,12 +41,13 @@ def get_worker_appointments():
             'customer_name': appt.customer_name,
             'customer_phone': appt.customer_phone,
             'worker_name': worker.name,
-            'service_name': appt.service.name if appt.service else None
+            'service_name': service_name
         })
     return jsonify(result)
 
 @worker_bp.route('/work_schedule', methods=['GET'])
 @worker_required
+@query_budget(3)
 def get_worker_schedule():
     worker = get_current_worker()
     if not worker:
@@ -0,0 +1,266 @@
+import hashlib
+import heapq
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import datetime, timedelta, time
+from itertools import islice
+from models import db, Appointment, Service, SlotHold, WorkerWorkHours, WorkerDayOccupancy
+from cache import TTLCache
+from database import on_primary
+
+BOOKING_DAYS = 8
+MAX_BOOKING_DAYS = 365
+STREAM_CHUNK_DAYS = 7
+CELL_MINUTES = 5
+CELLS_PER_DAY = 24 * 60 // CELL_MINUTES
+
+SLOT_CACHE_SIZE = 20000
+SLOT_CACHE_TTL = 300
+
+# (worker_id, service_id, date) -> (duration, occupancy version, free slot
+# times before the "now" cut-off and live holds are applied). An entry is
+# used only while its version matches worker_day_occupancy.version, which
+# every process bumps when it rewrites the row.
+slot_cache = TTLCache(SLOT_CACHE_SIZE, SLOT_CACHE_TTL)
+
+
+def get_time_slots(start_time, end_time, duration_minutes):
+    slots = []
+    current = datetime.combine(datetime.today(), start_time)
+    end = datetime.combine(datetime.today(), end_time)
+    delta = timedelta(minutes=duration_minutes)
+    while current + delta <= end:
+        slots.append(current.time())
+        current += delta
+    return slots
+
+
+def minute_of_day(value):
+    return value.hour * 60 + value.minute
+
+
+def cell_mask(start_minute, end_minute):
+    # Cells partially covered on either side count as occupied.
+    first = max(start_minute // CELL_MINUTES, 0)
+    last = min(-(-end_minute // CELL_MINUTES), CELLS_PER_DAY)
+    if last <= first:
+        return 0
+    return ((1 << (last - first)) - 1) << first
+
+
+def load_work_hours(worker_ids, start_date, end_date):
+    # One query for the whole horizon; the first row per worker-day wins,
+    # matching the previous per-day .first() lookup.
+    rows = WorkerWorkHours.query.filter(
+        WorkerWorkHours.worker_id.in_(worker_ids),
+        WorkerWorkHours.date >= start_date,
+        WorkerWorkHours.date <= end_date
+    ).order_by(WorkerWorkHours.id).all()
+
+    work_hours = {}
+    for wh in rows:
+        work_hours.setdefault((wh.worker_id, wh.date), wh)
+    return work_hours
+
+
+class BookedIntervals:
+    # Half-open [start, end) intervals sorted by start, with a running maximum
+    # of the end times so overlap queries stay O(log n) even if legacy data
+    # contains intervals nested inside each other.
+    def __init__(self, intervals):
+        self.starts = []
+        self.max_ends = []
+        max_end = None
+        for start, end in sorted(intervals):
+            max_end = end if max_end is None or end > max_end else max_end
+            self.starts.append(start)
+            self.max_ends.append(max_end)
+
+    def overlaps(self, start, end):
+        i = bisect_left(self.starts, end)
+        return i > 0 and self.max_ends[i - 1] > start
+
+
+def load_appointment_intervals(worker_ids, start_date, end_date):
+    query = db.session.query(
+        Appointment.worker_id,
+        Appointment.datetime,
+        Service.duration
+    ).join(Service, Appointment.service_id == Service.id).filter(
+        Appointment.worker_id.in_(worker_ids),
+        Appointment.datetime >= datetime.combine(start_date, time.min),
+        Appointment.datetime <= datetime.combine(end_date, time.max),
+        Appointment.status != 'Canceled'
+    )
+
+    intervals = defaultdict(list)
+    for worker_id, start, duration in query.all():
+        intervals[(worker_id, start.date())].append((start, start + timedelta(minutes=duration)))
+    for day_intervals in intervals.values():
+        day_intervals.sort()
+    return intervals
+
+
+def iter_free_slots_for_day(occupancy, duration_minutes, now=None, held=0):
+    busy = int.from_bytes(occupancy.busy, 'little') | held
+    for slot in get_time_slots(occupancy.start_work_hour, occupancy.end_work_hour, duration_minutes):
+        if now and occupancy.date == now.date() and slot <= now.time():
+            continue
+        start = minute_of_day(slot)
+        if busy & cell_mask(start, start + duration_minutes):
+            continue
+        yield slot
+
+
+def iter_worker_free_slots(worker_id, rows, duration_minutes, now, held):
+    # rows are the worker's occupancy rows in date order, so the stream is
+    # already sorted by datetime.
+    for occupancy in rows:
+        for slot in iter_free_slots_for_day(occupancy, duration_minutes, now, held.get((worker_id, occupancy.date), 0)):
+            yield datetime.combine(occupancy.date, slot), worker_id
+
+
+def load_occupancy(worker_ids, start_date, end_date):
+    return WorkerDayOccupancy.query.filter(
+        WorkerDayOccupancy.worker_id.in_(worker_ids),
+        WorkerDayOccupancy.date >= start_date,
+        WorkerDayOccupancy.date <= end_date
+    ).order_by(WorkerDayOccupancy.date).all()
+
+
+def load_held_cells(worker_ids, start_date, end_date):
+    # (worker_id, date) -> bitmap of the cells under live holds. Holds change
+    # every few minutes, so they are applied on top of slot_cache rather
+    # than baked into it.
+    rows = db.session.query(SlotHold.worker_id, SlotHold.slot_start).filter(
+        SlotHold.worker_id.in_(worker_ids),
+        SlotHold.slot_start >= datetime.combine(start_date, time.min),
+        SlotHold.slot_start <= datetime.combine(end_date, time.max),
+        SlotHold.expires_at > datetime.now()
+    )
+    held = defaultdict(int)
+    for worker_id, slot_start in rows:
+        held[(worker_id, slot_start.date())] |= 1 << (minute_of_day(slot_start) // CELL_MINUTES)
+    return held
+
+
+def without_held(slots, duration_minutes, held):
+    if not held:
+        return slots
+    return [slot for slot in slots if not held & cell_mask(minute_of_day(slot), minute_of_day(slot) + duration_minutes)]
+
+
+def load_day_versions(worker_ids, start_date, end_date):
+    # (worker_id, date) -> occupancy version; worker-days without a row (no
+    # work hours) are absent. Read from the primary because cache entries and
+    # ETags are only as fresh as these versions.
+    with on_primary(db.session):
+        rows = db.session.query(WorkerDayOccupancy.worker_id, WorkerDayOccupancy.date, WorkerDayOccupancy.version).filter(
+            WorkerDayOccupancy.worker_id.in_(worker_ids),
+            WorkerDayOccupancy.date >= start_date,
+            WorkerDayOccupancy.date <= end_date
+        ).all()
+    return {(worker_id, single_date): version for worker_id, single_date, version in rows}
+
+
+def availability_etag(worker_ids, service, start_date, end_date, versions, now=None, representation='json', held=None):
+    now = now or datetime.now()
+    held = held or {}
+    days = (end_date - start_date).days + 1
+    parts = [representation, str(service.id), str(service.duration), start_date.isoformat(), str(days), now.strftime('%Y-%m-%dT%H:%M')]
+    for worker_id in worker_ids:
+        parts.append(str(worker_id))
+        for n in range(days):
+            key = (worker_id, start_date + timedelta(n))
+            parts.append(f'{versions.get(key, 0)}:{held.get(key, 0)}')
+    return hashlib.sha1('|'.join(parts).encode()).hexdigest()
+
+
+def load_day_slots(keys, service, versions, held=None):
+    # Returns the free slots for each (worker_id, date) in keys, reading the
+    # occupancy index only for the worker-days whose cached slots are missing
+    # or older than their current version.
+    held = held or {}
+    day_slots = {}
+    missing = []
+    for key in keys:
+        if key not in versions:
+            day_slots[key] = []
+            continue
+        cached = slot_cache.get((key[0], service.id, key[1]))
+        if cached is not None and cached[0] == service.duration and cached[1] == versions[key]:
+            day_slots[key] = without_held(cached[2], service.duration, held.get(key, 0))
+        else:
+            missing.append(key)
+    if not missing:
+        return day_slots
+
+    # The rows end up in slot_cache, so they must not come from a replica
+    # that has not seen another process's booking yet.
+    with on_primary(db.session):
+        rows = load_occupancy(
+            {worker_id for worker_id, _ in missing},
+            min(single_date for _, single_date in missing),
+            max(single_date for _, single_date in missing)
+        )
+    loaded = {(occupancy.worker_id, occupancy.date): occupancy for occupancy in rows}
+
+    for key in missing:
+        occupancy = loaded.get(key)
+        slots = list(iter_free_slots_for_day(occupancy, service.duration)) if occupancy else []
+        day_slots[key] = without_held(slots, service.duration, held.get(key, 0))
+        if occupancy:
+            slot_cache.set((key[0], service.id, key[1]), (service.duration, occupancy.version, slots))
+
+    return day_slots
+
+
+def iter_available_days(worker_ids, service, start_date, end_date, versions, now=None, held=None):
+    # Yields (date, {worker_id: ['HH:MM', ...]}) one day at a time, reading
+    # the index in STREAM_CHUNK_DAYS windows so long horizons are never held
+    # in memory at once.
+    now = now or datetime.now()
+    chunk_start = start_date
+    while chunk_start <= end_date:
+        chunk_end = min(chunk_start + timedelta(days=STREAM_CHUNK_DAYS - 1), end_date)
+        dates = [chunk_start + timedelta(n) for n in range((chunk_end - chunk_start).days + 1)]
+        day_slots = load_day_slots([(worker_id, single_date) for worker_id in worker_ids for single_date in dates], service, versions, held)
+
+        for single_date in dates:
+            slots_by_worker = {}
+            for worker_id in worker_ids:
+                slots = day_slots[(worker_id, single_date)]
+                if single_date == now.date():
+                    slots = [slot for slot in slots if slot > now.time()]
+                if slots:
+                    slots_by_worker[worker_id] = [slot.strftime('%H:%M') for slot in slots]
+            yield single_date, slots_by_worker
+
+        chunk_start = chunk_end + timedelta(days=1)
+
+
+def get_available_slots(worker_ids, service, start_date, end_date, versions, now=None, held=None):
+    result = {worker_id: {} for worker_id in worker_ids}
+    for single_date, slots_by_worker in iter_available_days(worker_ids, service, start_date, end_date, versions, now, held):
+        for worker_id, slots in slots_by_worker.items():
+            result[worker_id][single_date.strftime('%Y-%m-%d')] = slots
+    return result
+
+
+def find_earliest_slots(worker_ids, service, limit, now=None, days=BOOKING_DAYS):
+    now = now or datetime.now()
+    start_date = now.date()
+    end_date = start_date + timedelta(days=days - 1)
+    held = load_held_cells(worker_ids, start_date, end_date)
+
+    rows_by_worker = defaultdict(list)
+    for occupancy in load_occupancy(worker_ids, start_date, end_date):
+        rows_by_worker[occupancy.worker_id].append(occupancy)
+
+    # k-way merge of the per-worker streams; slots past the first `limit`
+    # are never generated.
+    streams = [
+        iter_worker_free_slots(worker_id, rows, service.duration, now, held)
+        for worker_id, rows in rows_by_worker.items()
+    ]
+    return list(islice(heapq.merge(*streams), limit))
@@ -0,0 +1,86 @@
+import sys
+import os
+
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+import argparse
+import tempfile
+import threading
+from collections import Counter
+from datetime import date, time, timedelta
+
+from config import Config
+from models import db, Business, Branch, Position, Service, ServiceCost, Worker, WorkerWorkHours
+import occupancy
+
+# Hammers POST /appointments from many threads at once against a throwaway
+# SQLite file and checks that every contested slot is booked exactly once.
+parser = argparse.ArgumentParser(description='Concurrent booking stress test')
+parser.add_argument('--threads', type=int, default=16)
+parser.add_argument('--rounds', type=int, default=20)
+args = parser.parse_args()
+
+db_dir = tempfile.mkdtemp()
+Config.SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(db_dir, 'stress.db')
+
+from app import create_app
+
+app = create_app()
+booking_day = date.today() + timedelta(days=1)
+
+with app.app_context():
+    db.create_all()
+    business = Business(name='Stress')
+    db.session.add(business)
+    db.session.flush()
+    branch = Branch(name='Stress', business_id=business.id, locality='-', address='-', phone_number='-',
+                    start_work_hour=time(0, 0), end_work_hour=time(23, 55))
+    db.session.add(branch)
+    db.session.flush()
+    position = Position(name='Barber', branch_id=branch.id)
+    service = Service(name='Haircut', duration=30, branch_id=branch.id)
+    db.session.add_all([position, service])
+    db.session.flush()
+    db.session.add(ServiceCost(position_id=position.id, service_id=service.id, price=100))
+    worker = Worker(name='Stress', position_id=position.id, branch_id=branch.id, email='stress@example.com', password='-')
+    db.session.add(worker)
+    db.session.flush()
+    db.session.add(WorkerWorkHours(worker_id=worker.id, date=booking_day, start_work_hour=time(0, 0), end_work_hour=time(23, 55)))
+    occupancy.refresh_worker_day(worker.id, booking_day)
+    db.session.commit()
+    worker_id, service_id, branch_id = worker.id, service.id, branch.id
+
+failures = 0
+for round_number in range(args.rounds):
+    slot = f'{booking_day.isoformat()}T{(round_number * 30) // 60:02d}:{(round_number * 30) % 60:02d}'
+    barrier = threading.Barrier(args.threads)
+    statuses = Counter()
+    lock = threading.Lock()
+
+    def book(customer):
+        client = app.test_client()
+        barrier.wait()
+        response = client.post('/appointments', json={
+            'worker_id': worker_id,
+            'service_id': service_id,
+            'branch_id': branch_id,
+            'datetime': slot,
+            'customer_name': f'Customer {customer}',
+            'customer_phone': str(customer)
+        })
+        with lock:
+            statuses[response.status_code] += 1
+
+    threads = [threading.Thread(target=book, args=(i,)) for i in range(args.threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    ok = statuses[200] == 1 and statuses[409] == args.threads - 1
+    failures += not ok
+    print(f"{slot}: {dict(statuses)}{'' if ok else '  <-- FAILED'}")
+
+print(f"{args.rounds - failures}/{args.rounds} rounds booked exactly once.")
+sys.exit(1 if failures else 0)
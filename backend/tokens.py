@@ -0,0 +1,118 @@
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from flask_jwt_extended import create_access_token, create_refresh_token
+from models import db, RevokedToken
+from cache import after_commit
+from database import on_primary
+
+ACCESS_TOKEN_TTL = timedelta(minutes=30)
+REFRESH_TOKEN_TTL = timedelta(days=7)
+REVOCATION_SYNC_SECONDS = 5
+# Rows are stamped before their transaction commits, so each sync re-reads
+# this far behind the newest revoked_at it has seen to catch late commits.
+REVOCATION_SYNC_OVERLAP_SECONDS = 60
+REVOCATION_PURGE_SECONDS = 60 * 60
+
+
+def issue_tokens(identity, claims, family=None):
+    # Every token from one login shares a family id, so logging out revokes
+    # the whole chain of rotated refresh tokens and their access tokens.
+    claims = dict(claims, family=family or uuid.uuid4().hex)
+    return {
+        'access_token': create_access_token(identity=identity, additional_claims=claims, expires_delta=ACCESS_TOKEN_TTL),
+        'refresh_token': create_refresh_token(identity=identity, additional_claims=claims, expires_delta=REFRESH_TOKEN_TTL)
+    }
+
+
+def subject_key(payload):
+    kind = 'worker' if payload.get('role') == 'worker' else 'admin'
+    return f"subject:{kind}:{payload['sub']}"
+
+
+class RevocationList:
+    # In-memory copy of revoked_tokens. Other processes' revocations are
+    # picked up by reading rows revoked since the last one seen, at most every
+    # REVOCATION_SYNC_SECONDS, so the hot path is a dict lookup.
+    def __init__(self):
+        self._revoked = {}
+        self._watermark = 0.0
+        self._synced_at = None
+        self._purged_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _sync(self):
+        now = time.monotonic()
+        if self._synced_at is not None and now - self._synced_at < REVOCATION_SYNC_SECONDS:
+            return
+        with on_primary(db.session):
+            rows = db.session.query(RevokedToken.key, RevokedToken.revoked_at, RevokedToken.expires_at).filter(
+                RevokedToken.revoked_at > self._watermark - REVOCATION_SYNC_OVERLAP_SECONDS,
+                RevokedToken.expires_at > datetime.now()
+            ).all()
+        with self._lock:
+            for key, revoked_at, expires_at in rows:
+                self._set(key, revoked_at, expires_at)
+                self._watermark = max(self._watermark, revoked_at)
+            self._synced_at = now
+
+    def _set(self, key, revoked_at, expires_at):
+        current = self._revoked.get(key)
+        if current:
+            revoked_at, expires_at = max(revoked_at, current[0]), max(expires_at, current[1])
+        self._revoked[key] = (revoked_at, expires_at)
+
+    def _add(self, key, revoked_at, expires_at):
+        with self._lock:
+            self._set(key, revoked_at, expires_at)
+
+    def is_revoked(self, payload):
+        self._sync()
+        with self._lock:
+            if payload['jti'] in self._revoked or f"family:{payload.get('family')}" in self._revoked:
+                return True
+            entry = self._revoked.get(subject_key(payload))
+        return entry is not None and payload['iat'] <= entry[0]
+
+    def revoke(self, key, expires_at):
+        # Adds the row to the current session; the caller commits. A second
+        # revocation of the same jti fails on the unique key, which is what
+        # makes refresh tokens single-use under concurrent rotation.
+        self._purge()
+        revoked_at = time.time()
+        # Family and subject keys can be revoked again; a jti only once. The
+        # new revoked_at moves the row past other processes' watermarks.
+        existing = RevokedToken.query.filter_by(key=key).first() if ':' in key else None
+        if existing:
+            expires_at = max(existing.expires_at, expires_at)
+            existing.revoked_at = max(existing.revoked_at, revoked_at)
+            existing.expires_at = expires_at
+        else:
+            db.session.add(RevokedToken(key=key, revoked_at=revoked_at, expires_at=expires_at))
+        after_commit(db.session, self._add, key, revoked_at, expires_at)
+
+    def revoke_token(self, payload):
+        self.revoke(payload['jti'], datetime.fromtimestamp(payload['exp']))
+
+    def revoke_family(self, payload):
+        self.revoke(f"family:{payload['family']}", datetime.now() + REFRESH_TOKEN_TTL)
+
+    def revoke_subject(self, kind, subject_id):
+        # Used when an account is deleted or moved, so tokens carrying its
+        # old claims stop working before they expire.
+        self.revoke(f'subject:{kind}:{subject_id}', datetime.now() + REFRESH_TOKEN_TTL)
+
+    def _purge(self):
+        # Revocations outlive the tokens they block by nothing; expired rows
+        # and entries are dropped at most once per REVOCATION_PURGE_SECONDS.
+        if time.monotonic() - self._purged_at < REVOCATION_PURGE_SECONDS:
+            return
+        self._purged_at = time.monotonic()
+        now = datetime.now()
+        db.session.query(RevokedToken).filter(RevokedToken.expires_at <= now).delete()
+        with self._lock:
+            self._revoked = {key: entry for key, entry in self._revoked.items() if entry[1] > now}
+
+
+revocation_list = RevocationList()
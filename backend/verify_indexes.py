@@ -0,0 +1,128 @@
+import sys
+import os
+
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+import tempfile
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import event
+
+from config import Config
+from models import db, Admin, Appointment, Business, Branch, Position, Service, ServiceCost, Worker, WorkerWorkHours
+
+# Builds a throwaway database through the migrations, runs the real hot-path
+# queries and checks with EXPLAIN QUERY PLAN that SQLite answers each of them
+# through the expected index.
+db_dir = tempfile.mkdtemp()
+Config.SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(db_dir, 'verify.db')
+
+from app import create_app
+from flask_migrate import upgrade
+from passwords import hash_password
+import confirmations
+import reservations
+import scheduling
+
+app = create_app()
+today = date.today()
+
+with app.app_context():
+    upgrade()
+    business = Business(name='Verify')
+    db.session.add(business)
+    db.session.flush()
+    branch = Branch(name='Verify', business_id=business.id, locality='-', address='-', phone_number='-',
+                    start_work_hour=time(9, 0), end_work_hour=time(18, 0))
+    db.session.add(branch)
+    db.session.flush()
+    position = Position(name='Barber', branch_id=branch.id)
+    service = Service(name='Haircut', duration=30, branch_id=branch.id)
+    db.session.add_all([position, service])
+    db.session.flush()
+    db.session.add(ServiceCost(position_id=position.id, service_id=service.id, price=100))
+    worker = Worker(name='Verify', position_id=position.id, branch_id=branch.id, email='worker@verify', password='-')
+    owner = Admin(email='owner@verify', password=hash_password('pw'), role='owner', name='Owner')
+    owner.businesses.append(business)
+    manager = Admin(email='manager@verify', password=hash_password('pw'), role='manager', name='Manager', branch_id=branch.id)
+    db.session.add_all([worker, owner, manager])
+    db.session.flush()
+    for day in range(7):
+        db.session.add(WorkerWorkHours(worker_id=worker.id, date=today + timedelta(days=day), start_work_hour=time(9, 0), end_work_hour=time(18, 0)))
+        db.session.add(Appointment(worker_id=worker.id, service_id=service.id, branch_id=branch.id, status='Waiting',
+                                   datetime=datetime.combine(today + timedelta(days=day), time(10, 0)),
+                                   customer_name='Verify', customer_phone='-'))
+    db.session.commit()
+    worker_id, branch_id = worker.id, branch.id
+    appointment_id = Appointment.query.first().id
+
+client = app.test_client()
+
+
+def auth(email):
+    token = client.post('/login', json={'email': email, 'password': 'pw'}).get_json()['access_token']
+    return {'Authorization': 'Bearer ' + token}
+
+
+def in_context(fn):
+    def run():
+        with app.app_context():
+            fn()
+    return run
+
+
+report_range = f'start_date={today.isoformat()}T00:00&end_date={(today + timedelta(days=7)).isoformat()}T00:00'
+CHECKS = [
+    ('appointments', 'ix_appointments_worker_id_datetime', 'scheduling.load_appointment_intervals',
+     in_context(lambda: scheduling.load_appointment_intervals([worker_id], today, today + timedelta(days=7)))),
+    ('appointments', 'ix_appointments_branch_id_datetime_status', 'GET /manager/appointments',
+     lambda: client.get('/manager/appointments', headers=auth('manager@verify'))),
+    ('appointments', 'ix_appointments_branch_id_datetime_status', 'GET /owner/reports/clients',
+     lambda: client.get(f'/owner/reports/clients?branch_id={branch_id}&{report_range}', headers=auth('owner@verify'))),
+    ('worker_work_hours', 'uq_worker_work_hours_worker_id_date', 'scheduling.load_work_hours',
+     in_context(lambda: scheduling.load_work_hours([worker_id], today, today + timedelta(days=7)))),
+    ('services_cost', 'ix_services_cost_position_id_service_id', 'appointment confirmation',
+     in_context(lambda: confirmations.get_confirmation(appointment_id))),
+    # SQLite backs the uq_slot_reservations_worker_slot constraint with an
+    # automatic index.
+    ('slot_reservations', 'sqlite_autoindex_slot_reservations', 'reservations.has_conflict',
+     in_context(lambda: reservations.has_conflict(worker_id, datetime.combine(today, time(10, 0)), 30))),
+]
+
+
+def captured_statements(fn):
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', capture)
+    try:
+        fn()
+    finally:
+        event.remove(engine, 'before_cursor_execute', capture)
+    return engine, statements
+
+
+failures = 0
+for table, index, label, fn in CHECKS:
+    engine, statements = captured_statements(fn)
+    plans = []
+    with engine.connect() as conn:
+        for statement, parameters in statements:
+            if f'FROM {table}' not in statement and f'JOIN {table}' not in statement:
+                continue
+            rows = conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).all()
+            plans.append([row[-1] for row in rows])
+    used = any(index in step for plan in plans for step in plan)
+    failures += not used
+    print(f"{'ok  ' if used else 'FAIL'} {label}: {index}")
+    if not used:
+        for plan in plans:
+            for step in plan:
+                print(f'       {step}')
+
+sys.exit(1 if failures else 0)
@@ -0,0 +1,112 @@
+import sys
+import os
+
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+import tempfile
+from datetime import date, datetime, time, timedelta
+
+from config import Config
+from models import db, Admin, Appointment, Business, Branch, Position, Service, ServiceCost, Worker, WorkerWorkHours
+
+# Builds a throwaway database through the migrations, calls every endpoint
+# that declares a @query_budget and fails if one of them runs more statements
+# than it allows. Each call is made twice, with cold and then warm caches.
+db_dir = tempfile.mkdtemp()
+Config.SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(db_dir, 'verify.db')
+Config.SQL_INSTRUMENTATION = True
+Config.SQL_QUERY_BUDGET_STRICT = False
+Config.SLOW_QUERY_MS = 0
+
+from app import create_app
+from flask_migrate import upgrade
+from passwords import hash_password
+import occupancy
+import reservations
+
+app = create_app()
+today = date.today()
+
+with app.app_context():
+    upgrade()
+    business = Business(name='Verify')
+    db.session.add(business)
+    db.session.flush()
+    branch = Branch(name='Verify', business_id=business.id, locality='-', address='-', phone_number='-',
+                    start_work_hour=time(9, 0), end_work_hour=time(18, 0))
+    db.session.add(branch)
+    db.session.flush()
+    position = Position(name='Barber', branch_id=branch.id)
+    service = Service(name='Haircut', duration=30, branch_id=branch.id)
+    db.session.add_all([position, service])
+    db.session.flush()
+    db.session.add(ServiceCost(position_id=position.id, service_id=service.id, price=100))
+    workers = [Worker(name=f'Verify {n}', position_id=position.id, branch_id=branch.id, email=f'worker{n}@verify',
+                      password=hash_password('pw')) for n in range(3)]
+    owner = Admin(email='owner@verify', password=hash_password('pw'), role='owner', name='Owner')
+    owner.businesses.append(business)
+    manager = Admin(email='manager@verify', password=hash_password('pw'), role='manager', name='Manager', branch_id=branch.id)
+    db.session.add_all(workers + [owner, manager])
+    db.session.flush()
+    for worker in workers:
+        for day in range(8):
+            db.session.add(WorkerWorkHours(worker_id=worker.id, date=today + timedelta(days=day), start_work_hour=time(9, 0), end_work_hour=time(18, 0)))
+            appointment = Appointment(worker_id=worker.id, service_id=service.id, branch_id=branch.id, status='Waiting',
+                                      datetime=datetime.combine(today + timedelta(days=day), time(10, 0)),
+                                      customer_name='Verify', customer_phone='-')
+            db.session.add(appointment)
+            db.session.flush()
+            reservations.reserve(appointment, service.duration)
+    occupancy.rebuild_index()
+    db.session.commit()
+    worker_id, branch_id, business_id, service_id = workers[0].id, branch.id, business.id, service.id
+    appointment_id = Appointment.query.first().id
+
+client = app.test_client()
+
+
+def auth(email):
+    token = client.post('/login', json={'email': email, 'password': 'pw'}).get_json()['access_token']
+    return {'Authorization': 'Bearer ' + token}
+
+
+report_range = f'start_date={today.isoformat()}T00:00&end_date={(today + timedelta(days=7)).isoformat()}T00:00'
+owner_headers = auth('owner@verify')
+CALLS = [
+    (f'/cities/{business_id}', None),
+    (f'/workers/{worker_id}/services', None),
+    (f'/branches/{branch_id}/services/{service_id}/availability', None),
+    (f'/branches/{branch_id}/services/{service_id}/earliest_slots', None),
+    (f'/branches/{branch_id}/services_by_position', None),
+    (f'/appointments/{appointment_id}', None),
+    ('/worker/appointments', auth('worker0@verify')),
+    ('/worker/work_schedule', auth('worker0@verify')),
+    ('/manager/appointments', auth('manager@verify')),
+    (f'/owner/reports/revenue?branch_id={branch_id}&{report_range}', owner_headers),
+    (f'/owner/reports/clients?branch_id={branch_id}&{report_range}', owner_headers),
+    (f'/owner/reports/services?branch_id={branch_id}&{report_range}', owner_headers),
+]
+
+budgeted = {endpoint for endpoint, view in app.view_functions.items() if hasattr(view, 'query_budget')}
+adapter = app.url_map.bind('localhost')
+failures = 0
+for url, headers in CALLS:
+    endpoint, _ = adapter.match(url.split('?')[0], method='GET')
+    budgeted.discard(endpoint)
+    budget = app.view_functions[endpoint].query_budget
+    for attempt in ('cold', 'warm'):
+        response = client.get(url, headers=headers)
+        response.close()
+        queries = int(response.headers.get('X-DB-Queries', -1))
+        ok = response.status_code == 200 and 0 <= queries <= budget
+        failures += not ok
+        print(f"{'ok  ' if ok else 'FAIL'} GET {url.split('?')[0]} ({attempt}): {queries}/{budget} queries, {response.status_code}")
+
+# A budgeted endpoint missing from CALLS is a failure too, so new budgets get
+# a check here.
+for endpoint in sorted(budgeted):
+    failures += 1
+    print(f'FAIL {endpoint}: has a @query_budget but is not called here')
+
+sys.exit(1 if failures else 0)
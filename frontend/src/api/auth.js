@@ -6,3 +6,64 @@ export async function login(email, password) {
   const response = await axios.post(`${BASE_URL}/login`, { email, password });
   return response.data;
 }
+
+let refreshing = null;
+
+export async function refreshTokens() {
+  // Concurrent 401s share one refresh: a refresh token can only be used once.
+  if (!refreshing) {
+    const refreshToken = localStorage.getItem('refresh_token');
+    refreshing = axios.post(`${BASE_URL}/refresh`, null, {
+      headers: {
+        Authorization: `Bearer ${refreshToken}`
+      },
+      _skipRefresh: true
+    }).then((response) => {
+      localStorage.setItem('access_token', response.data.access_token);
+      localStorage.setItem('refresh_token', response.data.refresh_token);
+      return response.data.access_token;
+    }).finally(() => {
+      refreshing = null;
+    });
+  }
+  return refreshing;
+}
+
+export async function logout() {
+  const refreshToken = localStorage.getItem('refresh_token');
+  if (refreshToken) {
+    try {
+      await axios.post(`${BASE_URL}/logout`, null, {
+        headers: {
+          Authorization: `Bearer ${refreshToken}`
+        },
+        _skipRefresh: true
+      });
+    } catch (err) {
+      // The session is dropped locally either way.
+    }
+  }
+  localStorage.removeItem('access_token');
+  localStorage.removeItem('refresh_token');
+  localStorage.removeItem('role');
+}
+
+axios.interceptors.response.use(undefined, async (error) => {
+  const config = error.config;
+  if (
+    error.response && error.response.status === 401 &&
+    config && !config._skipRefresh && !config._retried &&
+    localStorage.getItem('refresh_token')
+  ) {
+    config._retried = true;
+    try {
+      const accessToken = await refreshTokens();
+      config.headers.Authorization = `Bearer ${accessToken}`;
+      return axios(config);
+    } catch (refreshError) {
+      localStorage.removeItem('access_token');
+      localStorage.removeItem('refresh_token');
+    }
+  }
+  return Promise.reject(error);
+});
@@ -22,8 +22,9 @@ export async function getAvailableSlots(worker_id, service_id) {
   return response.data;
 }
 
-export async function createAppointment(data) {
-  const response = await axios.post(`${BASE_URL}/appointments`, data);
+export async function createAppointment(data, idempotencyKey) {
+  const headers = idempotencyKey ? { 'Idempotency-Key': idempotencyKey } : {};
+  const response = await axios.post(`${BASE_URL}/appointments`, data, { headers });
   return response.data;
 }
 
@@ -55,3 +56,27 @@ export async function rescheduleAppointment(appointment_id, datetime) {
   const response = await axios.patch(`${BASE_URL}/appointments/${appointment_id}/reschedule`, { datetime });
   return response.data;
 }
+
+export async function getBranchAvailability(branch_id, service_id, position_id) {
+  let url = `${BASE_URL}/branches/${branch_id}/services/${service_id}/availability`;
+  if (position_id) {
+    url += `?position_id=${position_id}`;
+  }
+  const response = await axios.get(url);
+  return response.data;
+}
+
+export async function getEarliestSlots(branch_id, service_id, limit = 5) {
+  const response = await axios.get(`${BASE_URL}/branches/${branch_id}/services/${service_id}/earliest_slots?limit=${limit}`);
+  return response.data;
+}
+
+export async function createHold(data) {
+  const response = await axios.post(`${BASE_URL}/holds`, data);
+  return response.data;
+}
+
+export async function releaseHold(hold_id) {
+  const response = await axios.delete(`${BASE_URL}/holds/${hold_id}`);
+  return response.data;
+}
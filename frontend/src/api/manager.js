@@ -126,3 +126,15 @@ export const updateAppointmentStatus = async (appointmentId, status) => {
   });
   return response.data;
 };
+
+export const importAppointments = async (file) => {
+  const token = localStorage.getItem('access_token');
+  const contentType = file.name.endsWith('.csv') ? 'text/csv' : 'application/x-ndjson';
+  const response = await axios.post(`${BASE_URL}/manager/appointments/import`, file, {
+    headers: {
+      Authorization: `Bearer ${token}`,
+      'Content-Type': contentType
+    }
+  });
+  return response.data;
+};
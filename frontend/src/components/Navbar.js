@@ -1,14 +1,14 @@
 import React, { useEffect, useState } from 'react';
 import { Navbar, Nav, Container, Button, NavDropdown } from 'react-bootstrap';
 import { useNavigate } from 'react-router-dom';
+import { logout } from '../api/auth';
 
 function AdminNavbar({ role }) {
   const navigate = useNavigate();
 
 
-  const handleLogout = () => {
-    localStorage.removeItem('access_token');
-    localStorage.removeItem('role');
+  const handleLogout = async () => {
+    await logout();
     navigate('/login');
   };
 
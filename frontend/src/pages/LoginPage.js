@@ -14,6 +14,7 @@ function LoginPage() {
     try {
       const data = await login(email, password);
       localStorage.setItem('access_token', data.access_token);
+      localStorage.setItem('refresh_token', data.refresh_token);
       localStorage.setItem('role', data.role);
       if (data.role === 'owner') {
         navigate('/owner/mybusinesses');
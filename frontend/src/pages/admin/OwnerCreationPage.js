@@ -3,6 +3,7 @@ import { useNavigate } from 'react-router-dom';
 import { Container, Card, Form, Button, Alert } from 'react-bootstrap';
 import 'bootstrap/dist/css/bootstrap.min.css';
 import { registerOwner } from '../../api/developer';
+import { logout } from '../../api/auth';
 
 function OwnerCreationPage() {
   const [email, setEmail] = useState('');
@@ -24,9 +25,8 @@ function OwnerCreationPage() {
     }
   };
 
-  const handleLogout = () => {
-    localStorage.removeItem('access_token');
-    localStorage.removeItem('role');
+  const handleLogout = async () => {
+    await logout();
     navigate('/login');
   };
 
@@ -11,7 +11,7 @@ import {
   Row,
   Col
 } from 'react-bootstrap';
-import { getCitiesBranches, getWorkersByBranch, getServicesByWorker, getAvailableSlots, createAppointment, getServicesGroupedByPosition, getWorkersForServiceAndBranch } from '../../api/client';
+import { getCitiesBranches, getWorkersByBranch, getServicesByWorker, getAvailableSlots, createAppointment, getServicesGroupedByPosition, getWorkersForServiceAndBranch, createHold, releaseHold } from '../../api/client';
 import Calendar from 'react-calendar';
 import 'react-calendar/dist/Calendar.css';
 
@@ -43,6 +43,8 @@ function Appointments() {
   const [selectedDate, setSelectedDate] = useState(null);
   const [slotsForDate, setSlotsForDate] = useState([]);
   const [selectedSlot, setSelectedSlot] = useState(null);
+  const [holdId, setHoldId] = useState(null);
+  const [bookingKey, setBookingKey] = useState(null);
 
 
   const [servicesByPosition, setServicesByPosition] = useState([]);
@@ -99,6 +101,10 @@ function Appointments() {
   };
 
   const closeModal = () => {
+    if (holdId) {
+      releaseHold(holdId).catch(() => {});
+      setHoldId(null);
+    }
     setShowModal(false);
   };
 
@@ -223,7 +229,27 @@ function Appointments() {
   };
 
 
-  const handleSlotSelect = (slot) => {
+  const handleSlotSelect = async (slot) => {
+    setFormError('');
+    try {
+      // Picking another slot swaps the customer's hold instead of stacking a new one.
+      const hold = await createHold({
+        worker_id: selectedWorker,
+        service_id: selectedService,
+        datetime: `${selectedDate}T${slot}:00`,
+        replaces: holdId
+      });
+      setHoldId(hold.hold_id);
+    } catch (err) {
+      if (err.response && err.response.status === 409) {
+        setFormError(err.response.data.error);
+        return;
+      }
+      setHoldId(null);
+    }
+    // Resubmitting the form for the same slot reuses the key, so a retry after
+    // a lost response cannot book twice.
+    setBookingKey(crypto.randomUUID());
     setSelectedSlot(slot);
     setModalStep(5);
   };
@@ -246,12 +272,18 @@ function Appointments() {
         datetime: `${selectedDate}T${selectedSlot}:00`,
         customer_name: customerName,
         customer_phone: customerPhone,
-        branch_id: selectedBranch.id
-      });
+        branch_id: selectedBranch.id,
+        hold_id: holdId
+      }, bookingKey);
       setFormSuccess('Appointment created successfully');
+      setHoldId(null);
       setShowModal(false);
       navigate(`/appointment-confirmation/${response.appointment_id}`);
     } catch (err) {
+      if (err.response && err.response.status === 409) {
+        setFormError(err.response.data.error);
+        return;
+      }
       setFormError('Failed to create appointment');
     }
   };